@@ -6,14 +6,41 @@ Handles user registration, login, and session management.
 """
 
 import re
-from typing import Dict, Optional, Tuple, Literal
+import hmac
+import functools
+from typing import Dict, Iterable, List, Optional, Tuple, Literal
 from datetime import datetime
 from models import Member
-from storage import MemberStorage
+from library import get_library
+
+# Use RE2 for email matching when available: it runs patterns as a DFA
+# in linear time, which pays off when validating emails in bulk
+try:
+    import re2 as _email_re_engine
+except ImportError:
+    _email_re_engine = re
 
 # Global session dictionary to store the currently logged-in user
 session: Dict[str, str] = {}
 
+# Librarian credentials
+# In a real system, these would be stored securely
+LIBRARIAN_ID = "admin"
+_LIBRARIAN_PASSWORD = "Admin123"
+
+# Validation patterns, compiled once at import time
+_PW_UPPER = re.compile(r'[A-Z]')
+_PW_LOWER = re.compile(r'[a-z]')
+_PW_DIGIT = re.compile(r'[0-9]')
+_DIGITS = frozenset('0123456789')
+_EMAIL_RE = _email_re_engine.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+@functools.lru_cache(maxsize=1)
+def _librarian_password_hash() -> str:
+    """Get the bcrypt hash of the librarian password, computed on first use."""
+    return Member.hash_password(_LIBRARIAN_PASSWORD)
+
 
 def validate_password(password: str) -> bool:
     """
@@ -27,10 +54,21 @@ def validate_password(password: str) -> bool:
     """
     # Password must be at least 8 characters long
     # and contain at least one uppercase letter, one lowercase letter, and one digit
-    return (len(password) >= 8 and
-            re.search(r'[A-Z]', password) and
-            re.search(r'[a-z]', password) and
-            re.search(r'[0-9]', password))
+    # Length is the cheapest check and the most common reason to reject
+    if len(password) < 8:
+        return False
+    
+    if password.isascii():
+        # For ASCII text, lower() and upper() only change letters, so the
+        # result differs from the password exactly when that case is present
+        return (password != password.lower() and
+                password != password.upper() and
+                not _DIGITS.isdisjoint(password))
+    
+    # Non-ASCII passwords: only ASCII letters and digits count
+    return bool(_PW_UPPER.search(password) and
+                _PW_LOWER.search(password) and
+                _PW_DIGIT.search(password))
 
 
 def validate_email(email: str) -> bool:
@@ -44,8 +82,21 @@ def validate_email(email: str) -> bool:
         True if email is valid, False otherwise
     """
     # Simple email validation using regex
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
+
+
+def validate_emails(emails: Iterable[str]) -> List[bool]:
+    """
+    Validate many email addresses at once, e.g. for a bulk import.
+    
+    Args:
+        emails: Email addresses to validate
+        
+    Returns:
+        List with True for each valid email and False otherwise, in order
+    """
+    match = _EMAIL_RE.match
+    return [bool(match(email)) for email in emails]
 
 
 def register_member(data_dir: str, name: str, email: str, password: str, confirm_password: str) -> Tuple[bool, str]:
@@ -75,18 +126,12 @@ def register_member(data_dir: str, name: str, email: str, password: str, confirm
         return False, "Invalid email format"
     
     # Check if email is already registered
-    member_storage = MemberStorage(data_dir)
-    if member_storage.get_member_by_email(email):
+    member_storage = get_library(data_dir).member_storage
+    if member_storage.has_email(email):
         return False, "Email is already registered"
     
     # Generate a new member ID
-    members = member_storage.load_all()
-    if not members:
-        member_id = "1001"  # Start with 1001 if no members exist
-    else:
-        # Get the highest member ID and increment by 1
-        max_id = max(int(member.member_id) for member in members)
-        member_id = str(max_id + 1)
+    member_id = member_storage.next_member_id()
     
     # Hash the password
     password_hash = Member.hash_password(password)
@@ -123,20 +168,20 @@ def login(data_dir: str, id_or_email: str, password: str, role: Literal['librari
     """
     # For librarian login, use hardcoded credentials
     if role == 'librarian':
-        # In a real system, this would be stored securely
-        # and the password would be hashed
-        librarian_id = "admin"
-        librarian_password = "Admin123"
+        # Compare in constant time and always check the password,
+        # so a wrong username and a wrong password take equally long
+        id_matches = hmac.compare_digest(id_or_email.encode('utf-8'), LIBRARIAN_ID.encode('utf-8'))
+        password_matches = Member.check_password(password, _librarian_password_hash())
         
-        if id_or_email == librarian_id and password == librarian_password:
-            session['user_id'] = librarian_id
+        if id_matches and password_matches:
+            session['user_id'] = LIBRARIAN_ID
             session['role'] = 'librarian'
             return True, "Logged in as librarian"
         else:
             return False, "Invalid librarian credentials"
     
     # For member login
-    member_storage = MemberStorage(data_dir)
+    member_storage = get_library(data_dir).member_storage
     member = None
     
     # Check if input is an email or member ID
@@ -148,6 +193,7 @@ def login(data_dir: str, id_or_email: str, password: str, role: Literal['librari
     if not member:
         return False, "Member not found"
     
+    # Repeat checks of the same password are served from the model's cache
     if member.verify_password(password):
         session['user_id'] = member.member_id
         session['role'] = 'member'
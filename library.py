@@ -5,11 +5,23 @@ Core library functionality for the Library Management System.
 Contains functions for managing books, members, and loans.
 """
 
-from typing import List, Tuple, Optional
-from datetime import datetime, timedelta
-from models import Book, Member, Loan
+import csv
+import functools
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple, Optional
+from datetime import datetime
+from models import Book, Member, Loan, LOAN_PERIOD
 from storage import BookStorage, MemberStorage, LoanStorage
 
+# Month abbreviations for user messages, independent of the current locale
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _format_date(date: datetime) -> str:
+    """Format a date as DD-Mon-YYYY (e.g. 05-Mar-2024) for user messages."""
+    return f"{date.day:02d}-{_MONTHS[date.month - 1]}-{date.year}"
+
 
 class Library:
     """Library class that encapsulates all library functionality."""
@@ -22,9 +34,45 @@ class Library:
             data_dir: Directory containing CSV files
         """
         self.data_dir = data_dir
-        self.book_storage = BookStorage(data_dir)
-        self.member_storage = MemberStorage(data_dir)
-        self.loan_storage = LoanStorage(data_dir)
+    
+    # Storages are created on first use, so a call that only needs books
+    # never opens the member or loan files
+    
+    @functools.cached_property
+    def book_storage(self) -> BookStorage:
+        """Storage for books."""
+        return BookStorage(self.data_dir)
+    
+    @functools.cached_property
+    def member_storage(self) -> MemberStorage:
+        """Storage for members."""
+        return MemberStorage(self.data_dir)
+    
+    @functools.cached_property
+    def loan_storage(self) -> LoanStorage:
+        """Storage for loans."""
+        return LoanStorage(self.data_dir)
+    
+    def reload(self) -> None:
+        """Drop the storages so they are recreated, with fresh state, on next use."""
+        for name in ('book_storage', 'member_storage', 'loan_storage'):
+            self.__dict__.pop(name, None)
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group changes to books, members and loans.
+        
+        Each touched CSV file is written once when the block exits, and
+        nothing is written if the block raises. The files are written one
+        after another, books first, then members, then loans; if writing
+        one fails, the later ones are not written, but the earlier ones
+        keep their changes. So this is not atomic across files: a failed
+        loan write can leave a book's count changed without the loan.
+        """
+        # Batches close in reverse order, so the book batch goes innermost
+        with self.loan_storage.batch(), self.member_storage.batch(), self.book_storage.batch():
+            yield
     
     # Book management
     
@@ -64,6 +112,63 @@ class Library:
         except Exception as e:
             return False, f"An error occurred: {str(e)}"
     
+    def bulk_add_books(self, path: str) -> Tuple[bool, str]:
+        """
+        Add many books at once from a CSV file.
+        
+        The file has a header row followed by rows of ISBN, Title, Author,
+        Copies. Every row is checked before anything is saved, and the
+        books are then added to the book file in a single write, so
+        nothing is added if any row is invalid or any ISBN is taken.
+        
+        Args:
+            path: Path of the CSV file to import
+            
+        Returns:
+            Tuple (success, message)
+        """
+        try:
+            books = []
+            
+            with open(path, 'r', newline='', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                next(reader, None)  # Skip header row
+                for row in reader:
+                    if not row:
+                        continue
+                    try:
+                        if len(row) != 4:
+                            raise ValueError(f"Expected 4 columns, got {len(row)}")
+                        isbn, title, author, copies = row
+                        copies = int(copies)
+                        if not isbn or not title or not author or copies <= 0:
+                            raise ValueError("All fields are required and copies must be positive")
+                        
+                        books.append(Book(
+                            isbn=isbn,
+                            title=title,
+                            author=author,
+                            copies_total=copies,
+                            copies_available=copies
+                        ))
+                    except ValueError as e:
+                        return False, f"Failed to import books: line {reader.line_num}: {str(e)}"
+            
+            if not books:
+                return False, "No books found to import"
+            
+            # Checks the ISBNs against the stored books and each other
+            try:
+                self.book_storage.add_items(books)
+            except ValueError as e:
+                return False, f"Failed to import books: {str(e)}"
+            
+            return True, f"{len(books)} books imported successfully"
+        except OSError as e:
+            return False, f"Failed to read {path}: {str(e)}"
+        except Exception as e:
+            return False, f"An error occurred: {str(e)}"
+    
     def delete_book(self, isbn: str) -> Tuple[bool, str]:
         """
         Delete a book from the library.
@@ -163,42 +268,46 @@ class Library:
             Tuple (success, message)
         """
         try:
-            # Check if the book exists
-            book = self.book_storage.get_item_by_id(isbn)
-            if not book:
-                return False, f"Book with ISBN {isbn} not found"
-            
-            # Check if the member exists
-            member = self.member_storage.get_item_by_id(member_id)
-            if not member:
-                return False, f"Member with ID {member_id} not found"
-            
-            # Check if the book is available
-            if book.copies_available <= 0:
-                return False, f"Book '{book.title}' is not available"
-            
-            # Create a new loan
-            loan_id = self.loan_storage.generate_loan_id()
-            issue_date = datetime.now()
-            due_date = issue_date + timedelta(days=14)
-            
-            loan = Loan(
-                loan_id=loan_id,
-                member_id=member_id,
-                isbn=isbn,
-                issue_date=issue_date,
-                due_date=due_date,
-                return_date=None
-            )
-            
-            # Update book availability
-            book.copies_available -= 1
-            self.book_storage.update_item(book)
-            
-            # Add the loan
-            self.loan_storage.add_item(loan)
+            book_storage = self.book_storage
+            loan_storage = self.loan_storage
             
-            return True, f"Book '{book.title}' issued to {member.name} successfully. Due on {due_date.strftime('%d-%b-%Y')}."
+            with self.transaction():
+                # Check if the book exists
+                book = book_storage.get_item_by_id(isbn)
+                if not book:
+                    return False, f"Book with ISBN {isbn} not found"
+                
+                # Check if the member exists
+                member = self.member_storage.get_item_by_id(member_id)
+                if not member:
+                    return False, f"Member with ID {member_id} not found"
+                
+                # Check if the book is available
+                if book.copies_available <= 0:
+                    return False, f"Book '{book.title}' is not available"
+                
+                # Create a new loan
+                loan_id = loan_storage.generate_loan_id()
+                issue_date = datetime.now()
+                due_date = issue_date + LOAN_PERIOD
+                
+                loan = Loan(
+                    loan_id=loan_id,
+                    member_id=member_id,
+                    isbn=isbn,
+                    issue_date=issue_date,
+                    due_date=due_date,
+                    return_date=None
+                )
+                
+                # Update book availability
+                book.copies_available -= 1
+                book_storage.update_item(book)
+                
+                # Add the loan
+                loan_storage.add_item(loan)
+                
+                return True, f"Book '{book.title}' issued to {member.name} successfully. Due on {_format_date(due_date)}."
         except Exception as e:
             return False, f"An error occurred: {str(e)}"
     
@@ -213,59 +322,65 @@ class Library:
             Tuple (success, message)
         """
         try:
-            # Check if the loan exists
-            loan = self.loan_storage.get_item_by_id(loan_id)
-            if not loan:
-                return False, f"Loan with ID {loan_id} not found"
-            
-            # Check if the loan is already returned
-            if loan.return_date:
-                return False, f"Book already returned on {loan.return_date.strftime('%d-%b-%Y')}"
-            
-            # Get the book
-            book = self.book_storage.get_item_by_id(loan.isbn)
-            if not book:
-                return False, f"Book with ISBN {loan.isbn} not found"
-            
-            # Get the member
-            member = self.member_storage.get_item_by_id(loan.member_id)
-            if not member:
-                return False, f"Member with ID {loan.member_id} not found"
-            
-            # Update the loan
-            loan.return_date = datetime.now()
-            self.loan_storage.update_item(loan)
-            
-            # Update book availability
-            book.copies_available += 1
-            self.book_storage.update_item(book)
-            
-            # Check if the book is overdue
-            if loan.is_overdue():
-                days_overdue = (datetime.now() - loan.due_date).days
-                return True, f"Book '{book.title}' returned by {member.name}. The book was {days_overdue} days overdue."
-            else:
-                return True, f"Book '{book.title}' returned by {member.name} successfully."
+            with self.transaction():
+                # Check if the loan exists
+                loan = self.loan_storage.get_item_by_id(loan_id)
+                if not loan:
+                    return False, f"Loan with ID {loan_id} not found"
+                
+                # Check if the loan is already returned
+                if loan.return_date:
+                    return False, f"Book already returned on {_format_date(loan.return_date)}"
+                
+                # Get the book
+                book = self.book_storage.get_item_by_id(loan.isbn)
+                if not book:
+                    return False, f"Book with ISBN {loan.isbn} not found"
+                
+                # Get the member
+                member = self.member_storage.get_item_by_id(loan.member_id)
+                if not member:
+                    return False, f"Member with ID {loan.member_id} not found"
+                
+                # Update the loan
+                now = datetime.now()
+                loan.return_date = now
+                self.loan_storage.update_item(loan)
+                
+                # Update book availability
+                book.copies_available += 1
+                self.book_storage.update_item(book)
+                
+                # Check if the book is overdue
+                days_overdue = loan.days_overdue(now)
+                if days_overdue > 0:
+                    return True, f"Book '{book.title}' returned by {member.name}. The book was {days_overdue} days overdue."
+                else:
+                    return True, f"Book '{book.title}' returned by {member.name} successfully."
         except Exception as e:
             return False, f"An error occurred: {str(e)}"
     
-    def get_overdue_loans(self) -> List[Tuple[Loan, Book, Member]]:
+    def get_overdue_loans(self, now: Optional[datetime] = None) -> List[Tuple[Loan, Book, Member]]:
         """
         Get all overdue loans with book and member details.
         
+        Args:
+            now: Time to check against (defaults to the current time); pass
+                 the same value to Loan.days_overdue so both agree
+            
         Returns:
             List of tuples (loan, book, member)
         """
-        overdue_loans = self.loan_storage.get_overdue_loans()
-        result = []
+        overdue_loans = self.loan_storage.get_overdue_loans(now)
+        if not overdue_loans:
+            return []
         
-        for loan in overdue_loans:
-            book = self.book_storage.get_item_by_id(loan.isbn)
-            member = self.member_storage.get_item_by_id(loan.member_id)
-            if book and member:
-                result.append((loan, book, member))
+        # Look up all the books and members at once, rather than per loan
+        books = self.book_storage.get_items_by_ids([loan.isbn for loan in overdue_loans])
+        members = self.member_storage.get_items_by_ids([loan.member_id for loan in overdue_loans])
         
-        return result
+        return [(loan, book, member) for loan, book, member in zip(overdue_loans, books, members)
+                if book and member]
     
     def get_member_loans(self, member_id: str) -> List[Tuple[Loan, Book]]:
         """
@@ -278,14 +393,11 @@ class Library:
             List of tuples (loan, book)
         """
         loans = self.loan_storage.get_active_loans_for_member(member_id)
-        result = []
-        
-        for loan in loans:
-            book = self.book_storage.get_item_by_id(loan.isbn)
-            if book:
-                result.append((loan, book))
+        if not loans:
+            return []
         
-        return result
+        books = self.book_storage.get_items_by_ids([loan.isbn for loan in loans])
+        return [(loan, book) for loan, book in zip(loans, books) if book]
     
     def get_loan_history(self, member_id: str) -> List[Tuple[Loan, Book]]:
         """
@@ -297,13 +409,23 @@ class Library:
         Returns:
             List of tuples (loan, book)
         """
-        all_loans = self.loan_storage.load_all()
-        member_loans = [loan for loan in all_loans if loan.member_id == member_id]
-        result = []
+        loans = self.loan_storage.get_loans_for_member(member_id)
+        if not loans:
+            return []
         
-        for loan in member_loans:
-            book = self.book_storage.get_item_by_id(loan.isbn)
-            if book:
-                result.append((loan, book))
+        books = self.book_storage.get_items_by_ids([loan.isbn for loan in loans])
+        return [(loan, book) for loan, book in zip(loans, books) if book]
+
+
+@functools.lru_cache(maxsize=4)
+def get_library(data_dir: str) -> Library:
+    """
+    Get the shared Library instance for a data directory.
+    
+    Args:
+        data_dir: Directory containing CSV files
         
-        return result
+    Returns:
+        Library for the directory, created on first use
+    """
+    return Library(data_dir)
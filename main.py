@@ -8,16 +8,104 @@ Handles the CLI interface and integrates all modules.
 import os
 import sys
 import argparse
+import builtins
 from datetime import datetime
-from tabulate import tabulate
+from typing import Any, Iterable, Sequence
 from models import Book, Member, Loan
 from storage import BookStorage, MemberStorage, LoanStorage
-from library import Library
+from library import get_library
 from auth import (
     register_member, login, logout, is_logged_in,
     get_current_user_id, get_current_user_role, require_login
 )
 
+# Rows written to stdout per write call when printing tables
+_PRINT_BLOCK_ROWS = 256
+
+
+def _is_integer(value: Any) -> bool:
+    """
+    Check whether a table cell holds a whole number, as tabulate would see it.
+    
+    Args:
+        value: Cell value, either a number or a string such as an ID or ISBN
+        
+    Returns:
+        True if the value is an int or a string that parses as one
+    """
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    try:
+        int(value)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(value, str)
+
+
+def _print_table(rows: Iterable[Sequence[Any]], headers: Sequence[str]) -> int:
+    """
+    Print rows to stdout as a grid table in the style of tabulate's "grid" format.
+    
+    Rows may come from a generator. Only the cell strings are kept, since
+    column widths depend on every row, and the table is written a block of
+    rows at a time instead of being joined into one large string first.
+    As with tabulate, columns of whole numbers (including IDs and ISBNs)
+    are right-aligned along with their headers, and every column is at
+    least two characters wider than its header.
+    
+    Args:
+        rows: Table rows; each value is shown using str()
+        headers: Column headers
+        
+    Returns:
+        Number of rows printed; nothing is printed when there are none
+    """
+    numeric = [True] * len(headers)
+    cells = []
+    for row in rows:
+        numeric = [is_numeric and _is_integer(value) for is_numeric, value in zip(numeric, row)]
+        cells.append([str(value) for value in row])
+    if not cells:
+        return 0
+    widths = [max(len(header) + 2, *map(len, column)) for header, *column in zip(headers, *cells)]
+    
+    border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+    header_border = border.replace('-', '=')
+    line = '| ' + ' | '.join('{:%s%d}' % ('>' if is_numeric else '<', width)
+                             for is_numeric, width in zip(numeric, widths)) + ' |'
+    row_format = line + '\n' + border + '\n'
+    
+    write = sys.stdout.write
+    write(f"{border}\n{line.format(*headers)}\n{header_border}\n")
+    for start in range(0, len(cells), _PRINT_BLOCK_ROWS):
+        write(''.join(row_format.format(*row) for row in cells[start:start + _PRINT_BLOCK_ROWS]))
+    return len(cells)
+
+
+def _use_script_input(path: str) -> None:
+    """
+    Answer every input() prompt with the next line of a script file.
+    
+    The whole file is read up front, so a long script costs one read
+    rather than one per prompt, and prompts are not written out. Once the
+    script runs out, input() raises EOFError just as at the end of stdin.
+    
+    Args:
+        path: Path of the script file, one answer per line
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = iter(file.read().splitlines())
+    
+    def scripted_input(prompt: Any = '') -> str:
+        line = next(lines, None)
+        if line is None:
+            raise EOFError("End of script")
+        return line
+    
+    builtins.input = scripted_input
+
 
 class LibraryManagementSystem:
     """Main class for the Library Management System CLI."""
@@ -30,10 +118,14 @@ class LibraryManagementSystem:
             data_dir: Directory containing CSV files
         """
         self.data_dir = data_dir
-        self.library = Library(data_dir)
+        self.library = get_library(data_dir)
     
     def start(self):
         """Start the Library Management System."""
+        if os.name == 'nt':
+            # Makes the Windows console honour ANSI escape sequences
+            os.system('')
+        
         print("\n" + "=" * 50)
         print("📚 Welcome to the Library Management System 📚")
         print("=" * 50)
@@ -53,7 +145,10 @@ class LibraryManagementSystem:
     
     def clear_screen(self):
         """Clear the console screen."""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        # Write the ANSI clear/home sequence directly rather than
+        # spawning a 'clear'/'cls' shell process
+        sys.stdout.write('\x1b[2J\x1b[H')
+        sys.stdout.flush()
     
     def show_login_menu(self):
         """Show the login menu."""
@@ -270,32 +365,28 @@ class LibraryManagementSystem:
             return
         
         print("\n=== Overdue Books ===")
-        overdue_loans = self.library.get_overdue_loans()
+        # Read the clock once for the whole list
+        now = datetime.now()
+        overdue_loans = self.library.get_overdue_loans(now)
         
         if not overdue_loans:
             print("\nNo overdue books.")
             return
         
-        # Prepare table data
-        table_data = []
-        for loan, book, member in overdue_loans:
-            days_overdue = (datetime.now() - loan.due_date).days
-            table_data.append([
+        # Build rows lazily and print the table
+        rows = (
+            [
                 loan.loan_id,
                 book.isbn,
                 book.title,
                 member.member_id,
                 member.name,
-                loan.due_date.strftime('%Y-%m-%d'),
-                f"{days_overdue} days"
-            ])
-        
-        # Print the table
-        print(tabulate(
-            table_data,
-            headers=["Loan ID", "ISBN", "Title", "Member ID", "Member Name", "Due Date", "Overdue"],
-            tablefmt="grid"
-        ))
+                loan.due_date_str,
+                f"{loan.days_overdue(now)} days"
+            ]
+            for loan, book, member in overdue_loans
+        )
+        _print_table(rows, ["Loan ID", "ISBN", "Title", "Member ID", "Member Name", "Due Date", "Overdue"])
     
     def view_all_books(self):
         """View all books."""
@@ -311,23 +402,18 @@ class LibraryManagementSystem:
             print("\nNo books in the library.")
             return
         
-        # Prepare table data
-        table_data = []
-        for book in books:
-            table_data.append([
+        # Build rows lazily and print the table
+        rows = (
+            [
                 book.isbn,
                 book.title,
                 book.author,
                 book.copies_total,
                 book.copies_available
-            ])
-        
-        # Print the table
-        print(tabulate(
-            table_data,
-            headers=["ISBN", "Title", "Author", "Total Copies", "Available Copies"],
-            tablefmt="grid"
-        ))
+            ]
+            for book in books
+        )
+        _print_table(rows, ["ISBN", "Title", "Author", "Total Copies", "Available Copies"])
     
     def view_all_members(self):
         """View all members."""
@@ -343,22 +429,17 @@ class LibraryManagementSystem:
             print("\nNo members registered.")
             return
         
-        # Prepare table data
-        table_data = []
-        for member in members:
-            table_data.append([
+        # Build rows lazily and print the table
+        rows = (
+            [
                 member.member_id,
                 member.name,
                 member.email,
-                member.join_date.strftime('%Y-%m-%d')
-            ])
-        
-        # Print the table
-        print(tabulate(
-            table_data,
-            headers=["Member ID", "Name", "Email", "Join Date"],
-            tablefmt="grid"
-        ))
+                member.join_date_str
+            ]
+            for member in members
+        )
+        _print_table(rows, ["Member ID", "Name", "Email", "Join Date"])
     
     # Member functions
     
@@ -373,23 +454,18 @@ class LibraryManagementSystem:
             print(f"\nNo books found matching '{keyword}'")
             return
         
-        # Prepare table data
-        table_data = []
-        for book in books:
-            table_data.append([
+        # Build rows lazily and print the table
+        rows = (
+            [
                 book.isbn,
                 book.title,
                 book.author,
                 book.copies_available,
                 "Available" if book.copies_available > 0 else "Not Available"
-            ])
-        
-        # Print the table
-        print(tabulate(
-            table_data,
-            headers=["ISBN", "Title", "Author", "Available Copies", "Status"],
-            tablefmt="grid"
-        ))
+            ]
+            for book in books
+        )
+        _print_table(rows, ["ISBN", "Title", "Author", "Available Copies", "Status"])
     
     def borrow_book(self):
         """Borrow a book (for members)."""
@@ -426,25 +502,21 @@ class LibraryManagementSystem:
             print("\nYou have no active loans.")
             return
         
-        # Prepare table data
-        table_data = []
-        for loan, book in loans:
-            table_data.append([
+        # Build rows lazily and print the table
+        now = datetime.now()
+        rows = (
+            [
                 loan.loan_id,
                 book.isbn,
                 book.title,
                 book.author,
-                loan.issue_date.strftime('%Y-%m-%d'),
-                loan.due_date.strftime('%Y-%m-%d'),
-                "Yes" if loan.is_overdue() else "No"
-            ])
-        
-        # Print the table
-        print(tabulate(
-            table_data,
-            headers=["Loan ID", "ISBN", "Title", "Author", "Issue Date", "Due Date", "Overdue"],
-            tablefmt="grid"
-        ))
+                loan.issue_date_str,
+                loan.due_date_str,
+                "Yes" if loan.is_overdue(now) else "No"
+            ]
+            for loan, book in loans
+        )
+        _print_table(rows, ["Loan ID", "ISBN", "Title", "Author", "Issue Date", "Due Date", "Overdue"])
     
     def view_loan_history(self):
         """View loan history for the logged-in member."""
@@ -461,24 +533,19 @@ class LibraryManagementSystem:
             print("\nYou have no loan history.")
             return
         
-        # Prepare table data
-        table_data = []
-        for loan, book in loans:
-            table_data.append([
+        # Build rows lazily and print the table
+        rows = (
+            [
                 loan.loan_id,
                 book.isbn,
                 book.title,
-                loan.issue_date.strftime('%Y-%m-%d'),
-                loan.due_date.strftime('%Y-%m-%d'),
-                loan.return_date.strftime('%Y-%m-%d') if loan.return_date else "Not Returned"
-            ])
-        
-        # Print the table
-        print(tabulate(
-            table_data,
-            headers=["Loan ID", "ISBN", "Title", "Issue Date", "Due Date", "Return Date"],
-            tablefmt="grid"
-        ))
+                loan.issue_date_str,
+                loan.due_date_str,
+                loan.return_date_str or "Not Returned"
+            ]
+            for loan, book in loans
+        )
+        _print_table(rows, ["Loan ID", "ISBN", "Title", "Issue Date", "Due Date", "Return Date"])
 
 
 def main():
@@ -487,15 +554,35 @@ def main():
     parser = argparse.ArgumentParser(description='Library Management System')
     parser.add_argument('--data-dir', dest='data_dir', default='./data',
                       help='Directory containing CSV files (default: ./data)')
+    parser.add_argument('--script', metavar='FILE',
+                      help='Read menu answers from FILE, one per line, instead of the keyboard')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    bulk_parser = subparsers.add_parser('bulk-import-books',
+                                        help='Add books from a CSV file (ISBN, Title, Author, Copies) and exit')
+    bulk_parser.add_argument('path', help='CSV file to import, with a header row')
     
     args = parser.parse_args()
     
+    # Non-interactive commands
+    if args.command == 'bulk-import-books':
+        success, message = get_library(args.data_dir).bulk_add_books(args.path)
+        if success:
+            print(f"✅ {message}")
+        else:
+            print(f"❌ {message}")
+        sys.exit(0 if success else 1)
+    
+    if args.script:
+        _use_script_input(args.script)
+    
     # Create and start the Library Management System
     lms = LibraryManagementSystem(args.data_dir)
     
     try:
         lms.start()
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
+        # EOFError: stdin or the script ran out of input
         print("\nExiting Library Management System. Goodbye!")
         sys.exit(0)
 
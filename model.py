@@ -5,16 +5,124 @@ Data models for the Library Management System.
 Contains the Book, Member, and Loan classes.
 """
 
+import functools
+import hashlib
+import os
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import ClassVar, Iterable, List, Optional, Tuple
 import bcrypt
 import re
 
+# How long a book may be kept before it is overdue
+LOAN_PERIOD = timedelta(days=14)
 
-@dataclass
+# bcrypt cost factor used for new password hashes. Each step doubles the
+# time taken; set BCRYPT_ROUNDS lower (e.g. 4) for development and tests.
+_DEFAULT_BCRYPT_ROUNDS = 12
+_MIN_BCRYPT_ROUNDS = 4
+_MAX_BCRYPT_ROUNDS = 31
+
+# Results of recent bcrypt checks, by digest of hash and password, oldest first
+_VERIFY_CACHE_SIZE = 1024
+_verified: 'OrderedDict[bytes, bool]' = OrderedDict()
+
+# Validation patterns, compiled once at import time
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+def _bcrypt_rounds() -> int:
+    """Get the bcrypt cost from BCRYPT_ROUNDS, clamped to the range bcrypt accepts."""
+    try:
+        rounds = int(os.environ.get('BCRYPT_ROUNDS', _DEFAULT_BCRYPT_ROUNDS))
+    except ValueError:
+        return _DEFAULT_BCRYPT_ROUNDS
+    return min(max(rounds, _MIN_BCRYPT_ROUNDS), _MAX_BCRYPT_ROUNDS)
+
+
+def _valid_isbn(isbn: str) -> bool:
+    """
+    Check that an ISBN is 10 or 13 ASCII digits.
+    
+    Both string checks run in C over the whole string, which is cheaper
+    than a regex match when importing many books.
+    """
+    return len(isbn) in (10, 13) and isbn.isascii() and isbn.isdigit()
+
+
+def _verify_cached(password_hash: str, password: str) -> bool:
+    """
+    Check a password against a bcrypt hash, remembering the result.
+    
+    bcrypt is deliberately slow, so repeated checks of the same pair
+    (e.g. logging in again in the same session) are served from the cache.
+    The hash is part of the key, so a changed password never hits a stale entry.
+    Entries are keyed by a SHA-256 digest, so no password is kept in memory.
+    """
+    key = hashlib.sha256(f"{password_hash}\0{password}".encode('utf-8')).digest()
+    result = _verified.get(key)
+    if result is not None:
+        _verified.move_to_end(key)
+        return result
+    
+    try:
+        result = bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed hash: treat as a failed check so the result is cached too
+        result = False
+    _verified[key] = result
+    if len(_verified) > _VERIFY_CACHE_SIZE:
+        # Drop the least recently used entry
+        _verified.popitem(last=False)
+    return result
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse_date(value: str) -> datetime:
+    """
+    Parse a YYYY-MM-DD date string.
+    
+    CSV files repeat the same few thousand dates across many rows, so
+    results are memoized and strptime only runs once per distinct date.
+    datetime objects are immutable, so sharing them between rows is safe.
+    """
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def _csv_field(value: str) -> str:
+    """
+    Quote a text field the way csv.writer does by default: only if it
+    contains a comma, a double quote or a line break, doubling any quotes.
+    """
+    if ',' in value or '"' in value or '\n' in value or '\r' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _midnight(date: datetime) -> datetime:
+    """Drop the time of day from a datetime; the CSV files only keep the date."""
+    return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+@functools.lru_cache(maxsize=8192)
+def _iso_date(date: datetime) -> str:
+    """
+    Format a date as YYYY-MM-DD; an f-string is several times faster than strftime.
+    
+    Saving writes the same few thousand dates across many rows, so
+    results are memoized like _parse_date.
+    """
+    return f"{date.year:04d}-{date.month:02d}-{date.day:02d}"
+
+
+@dataclass(slots=True)
 class Book:
     """Represents a book in the library."""
+    # Column names in the header row of the CSV file
+    CSV_HEADER: ClassVar[Tuple[str, ...]] = ('ISBN', 'Title', 'Author', 'CopiesTotal', 'CopiesAvailable')
+    
     isbn: str
     title: str
     author: str
@@ -30,7 +138,7 @@ class Book:
             self.copies_available = int(self.copies_available)
         
         # Validate ISBN format (simple validation)
-        if not re.match(r'^\d{10}(\d{3})?$', self.isbn):
+        if not _valid_isbn(self.isbn):
             raise ValueError(f"Invalid ISBN format: {self.isbn}")
         
         # Validate number of copies
@@ -45,23 +153,49 @@ class Book:
         """Convert book to CSV row."""
         return [self.isbn, self.title, self.author, str(self.copies_total), str(self.copies_available)]
     
+    def to_csv_line(self) -> str:
+        """Format book as a CSV line, exactly as csv.writer would write to_csv_row()."""
+        # The ISBN is validated as digits, so only the free text needs quoting
+        return f"{self.isbn},{_csv_field(self.title)},{_csv_field(self.author)},{self.copies_total},{self.copies_available}\r\n"
+    
+    @classmethod
+    def _unsafe(cls, isbn: str, title: str, author: str, copies_total: int, copies_available: int) -> 'Book':
+        """
+        Create a Book from values that are already known to be valid,
+        skipping __post_init__. Only for data this program validated itself.
+        """
+        book = cls.__new__(cls)
+        book.isbn = isbn
+        book.title = title
+        book.author = author
+        book.copies_total = copies_total
+        book.copies_available = copies_available
+        return book
+    
     @classmethod
     def from_csv_row(cls, row: list) -> 'Book':
         """Create a Book instance from a CSV row."""
-        if len(row) != 5:
-            raise ValueError(f"Invalid book CSV row: {row}")
+        # Unpack the fields positionally; a row of the wrong length fails here
+        try:
+            isbn, title, author, copies_total, copies_available = row
+        except ValueError:
+            raise ValueError(f"Invalid book CSV row: {row}") from None
         return cls(
-            isbn=row[0],
-            title=row[1],
-            author=row[2],
-            copies_total=int(row[3]),
-            copies_available=int(row[4])
+            isbn=isbn,
+            title=title,
+            # Many books share an author: intern so they share one string
+            author=sys.intern(author),
+            copies_total=int(copies_total),
+            copies_available=int(copies_available)
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Member:
     """Represents a library member."""
+    # Column names in the header row of the CSV file
+    CSV_HEADER: ClassVar[Tuple[str, ...]] = ('MemberID', 'Name', 'PasswordHash', 'Email', 'JoinDate')
+    
     member_id: str
     name: str
     password_hash: str
@@ -70,14 +204,22 @@ class Member:
     
     def __post_init__(self):
         """Validate member data after initialization."""
-        # Convert string date to datetime if needed
+        # Convert string date to datetime if needed, keeping only the date
+        # as the CSV file does
         if isinstance(self.join_date, str):
-            self.join_date = datetime.strptime(self.join_date, "%Y-%m-%d")
+            self.join_date = _parse_date(self.join_date)
+        else:
+            self.join_date = _midnight(self.join_date)
         
         # Validate email format
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', self.email):
+        if not _EMAIL_RE.match(self.email):
             raise ValueError(f"Invalid email format: {self.email}")
     
+    @property
+    def join_date_str(self) -> str:
+        """Join date as YYYY-MM-DD."""
+        return _iso_date(self.join_date)
+    
     def to_csv_row(self) -> list:
         """Convert member to CSV row."""
         return [
@@ -85,37 +227,67 @@ class Member:
             self.name,
             self.password_hash,
             self.email,
-            self.join_date.strftime("%Y-%m-%d")
+            self.join_date_str
         ]
     
+    def to_csv_line(self) -> str:
+        """Format member as a CSV line, exactly as csv.writer would write to_csv_row()."""
+        return (f"{_csv_field(self.member_id)},{_csv_field(self.name)},{_csv_field(self.password_hash)},"
+                f"{_csv_field(self.email)},{self.join_date_str}\r\n")
+    
+    @classmethod
+    def _unsafe(cls, member_id: str, name: str, password_hash: str, email: str, join_date: datetime) -> 'Member':
+        """
+        Create a Member from values that are already known to be valid,
+        skipping __post_init__. Only for data this program validated itself.
+        """
+        member = cls.__new__(cls)
+        member.member_id = member_id
+        member.name = name
+        member.password_hash = password_hash
+        member.email = email
+        member.join_date = join_date
+        return member
+    
     @classmethod
     def from_csv_row(cls, row: list) -> 'Member':
         """Create a Member instance from a CSV row."""
-        if len(row) != 5:
-            raise ValueError(f"Invalid member CSV row: {row}")
+        # Unpack the fields positionally; a row of the wrong length fails here
+        try:
+            member_id, name, password_hash, email, join_date = row
+        except ValueError:
+            raise ValueError(f"Invalid member CSV row: {row}") from None
         return cls(
-            member_id=row[0],
-            name=row[1],
-            password_hash=row[2],
-            email=row[3],
-            join_date=row[4]
+            member_id=member_id,
+            name=name,
+            password_hash=password_hash,
+            email=email,
+            join_date=join_date
         )
     
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using bcrypt."""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=_bcrypt_rounds())
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
+    @staticmethod
+    def check_password(password: str, password_hash: str) -> bool:
+        """Check a password against a bcrypt hash."""
+        return _verify_cached(password_hash, password)
+    
     def verify_password(self, password: str) -> bool:
         """Verify a password against the stored hash."""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return self.check_password(password, self.password_hash)
 
 
-@dataclass
+@dataclass(slots=True)
 class Loan:
     """Represents a book loan."""
+    # Column names in the header row of the CSV file
+    CSV_HEADER: ClassVar[Tuple[str, ...]] = ('LoanID', 'MemberID', 'ISBN', 'IssueDate', 'DueDate', 'ReturnDate')
+    
     loan_id: str
     member_id: str
     isbn: str
@@ -127,11 +299,33 @@ class Loan:
         """Validate loan data after initialization."""
         # Convert string dates to datetime objects if needed
         if isinstance(self.issue_date, str):
-            self.issue_date = datetime.strptime(self.issue_date, "%Y-%m-%d")
+            self.issue_date = _parse_date(self.issue_date)
         if isinstance(self.due_date, str):
-            self.due_date = datetime.strptime(self.due_date, "%Y-%m-%d")
+            self.due_date = _parse_date(self.due_date)
         if isinstance(self.return_date, str) and self.return_date:
-            self.return_date = datetime.strptime(self.return_date, "%Y-%m-%d")
+            self.return_date = _parse_date(self.return_date)
+        
+        # The CSV file only keeps the dates, so drop the time of day to hold
+        # the same values in memory as are read back from the file
+        self.issue_date = _midnight(self.issue_date)
+        self.due_date = _midnight(self.due_date)
+        if self.return_date:
+            self.return_date = _midnight(self.return_date)
+    
+    @property
+    def issue_date_str(self) -> str:
+        """Issue date as YYYY-MM-DD."""
+        return _iso_date(self.issue_date)
+    
+    @property
+    def due_date_str(self) -> str:
+        """Due date as YYYY-MM-DD."""
+        return _iso_date(self.due_date)
+    
+    @property
+    def return_date_str(self) -> str:
+        """Return date as YYYY-MM-DD, or an empty string if not returned."""
+        return _iso_date(self.return_date) if self.return_date else ""
     
     def to_csv_row(self) -> list:
         """Convert loan to CSV row."""
@@ -139,30 +333,89 @@ class Loan:
             self.loan_id,
             self.member_id,
             self.isbn,
-            self.issue_date.strftime("%Y-%m-%d"),
-            self.due_date.strftime("%Y-%m-%d"),
-            self.return_date.strftime("%Y-%m-%d") if self.return_date else ""
+            self.issue_date_str,
+            self.due_date_str,
+            self.return_date_str
         ]
     
+    def to_csv_line(self) -> str:
+        """Format loan as a CSV line, exactly as csv.writer would write to_csv_row()."""
+        return (f"{_csv_field(self.loan_id)},{_csv_field(self.member_id)},{_csv_field(self.isbn)},"
+                f"{self.issue_date_str},{self.due_date_str},{self.return_date_str}\r\n")
+    
+    @classmethod
+    def _unsafe(cls, loan_id: str, member_id: str, isbn: str, issue_date: datetime,
+                due_date: datetime, return_date: Optional[datetime]) -> 'Loan':
+        """
+        Create a Loan from values that are already known to be valid,
+        skipping __post_init__. Only for data this program validated itself.
+        """
+        loan = cls.__new__(cls)
+        loan.loan_id = loan_id
+        loan.member_id = member_id
+        loan.isbn = isbn
+        loan.issue_date = issue_date
+        loan.due_date = due_date
+        loan.return_date = return_date
+        return loan
+    
+    def date_only(self) -> 'Loan':
+        """
+        Get a copy of the loan with the time of day dropped from its dates,
+        i.e. the loan as it reads back from the CSV file.
+        """
+        return self._unsafe(self.loan_id, self.member_id, self.isbn, _midnight(self.issue_date),
+                            _midnight(self.due_date), _midnight(self.return_date) if self.return_date else None)
+    
     @classmethod
     def from_csv_row(cls, row: list) -> 'Loan':
         """Create a Loan instance from a CSV row."""
-        if len(row) != 6:
-            raise ValueError(f"Invalid loan CSV row: {row}")
+        # Unpack the fields positionally; a row of the wrong length fails here
+        try:
+            loan_id, member_id, isbn, issue_date, due_date, return_date = row
+        except ValueError:
+            raise ValueError(f"Invalid loan CSV row: {row}") from None
         return cls(
-            loan_id=row[0],
-            member_id=row[1],
-            isbn=row[2],
-            issue_date=row[3],
-            due_date=row[4],
-            return_date=row[5] if row[5] else None
+            loan_id=loan_id,
+            member_id=member_id,
+            isbn=isbn,
+            issue_date=issue_date,
+            due_date=due_date,
+            return_date=return_date if return_date else None
         )
     
+    @classmethod
+    def from_csv_rows(cls, rows: Iterable[list]) -> List['Loan']:
+        """
+        Create Loan instances from many CSV rows at once.
+        
+        Gives the same loans as from_csv_row on each row, but unpacks the
+        row directly and builds the loan without going through __init__
+        and __post_init__, which is most of the per-row cost.
+        
+        Args:
+            rows: CSV rows
+            
+        Returns:
+            List of loans, in the same order as the rows
+        """
+        loans = []
+        for row in rows:
+            try:
+                loan_id, member_id, isbn, issue_date, due_date, return_date = row
+                loan = cls._unsafe(loan_id, member_id, isbn, _parse_date(issue_date), _parse_date(due_date),
+                                   _parse_date(return_date) if return_date else None)
+            except ValueError:
+                # Report the bad row the same way as from_csv_row
+                loan = cls.from_csv_row(row)
+            loans.append(loan)
+        return loans
+    
     @classmethod
     def create_new_loan(cls, loan_id: str, member_id: str, isbn: str) -> 'Loan':
         """Create a new loan with the current date and a 14-day due date."""
         issue_date = datetime.now()
-        due_date = issue_date + timedelta(days=14)
+        due_date = issue_date + LOAN_PERIOD
         return cls(
             loan_id=loan_id,
             member_id=member_id,
@@ -171,6 +424,27 @@ class Loan:
             due_date=due_date
         )
     
-    def is_overdue(self) -> bool:
-        """Check if the book is overdue."""
-        return not self.return_date and datetime.now() > self.due_date
+    def is_overdue(self, now: Optional[datetime] = None) -> bool:
+        """
+        Check if the book is overdue.
+        
+        Args:
+            now: Current time; pass it in when checking many loans at once
+                 to avoid reading the clock for each one
+        """
+        if now is None:
+            now = datetime.now()
+        return not self.return_date and now > self.due_date
+    
+    def days_overdue(self, now: Optional[datetime] = None) -> int:
+        """
+        Count the whole days from the due date to now (0 if not yet past due).
+        
+        Works on day ordinals, so no timedelta is created per loan.
+        
+        Args:
+            now: Current time; pass it in when checking many loans at once
+        """
+        if now is None:
+            now = datetime.now()
+        return max(0, now.toordinal() - self.due_date.toordinal())
@@ -5,15 +5,121 @@ Storage module for the Library Management System.
 Handles reading from and writing to CSV files.
 """
 
+import copy
 import csv
+import gc
 import os
-from typing import List, Dict, Optional, Type, TypeVar, Generic
+import pickle
+import stat
+import tempfile
+from bisect import bisect_left
+from contextlib import closing, contextmanager
+from dataclasses import fields
+from itertools import compress, starmap
+from operator import attrgetter, not_
+from typing import Any, Callable, List, Dict, Iterable, Iterator, Optional, Set, Tuple, Type, TypeVar, Generic
 from models import Book, Member, Loan
 from datetime import datetime
 
 # Type variable for generic functions
 T = TypeVar('T', Book, Member, Loan)
 
+# Buffer size for reading and writing CSV files (1 MiB), so large files
+# are moved in a few big read()/write() calls instead of many 8 KiB ones.
+# The same size is used for small files: sizing the buffer to the file
+# needs another stat() call, which costs more than the allocation saves.
+IO_BUFFER_SIZE = 1024 * 1024
+
+# Identifies one version of a file: (inode, mtime in ns, size, writes
+# made by this process). Counting our own writes catches rewrites that
+# keep the size and land within the file system's timestamp resolution.
+FileSignature = Tuple[int, int, int, int]
+
+# Number of times this process has written each file, by absolute path
+_write_counts: Dict[str, int] = {}
+
+# Format of the pickle snapshots kept next to the CSV files; bump it
+# whenever the models change so that old snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+# For each model: the attribute holding the item's ID, and how that ID
+# is described in error messages. The CSV header comes from the model.
+_MODEL_SPECS: Dict[type, Tuple[str, str]] = {
+    Book: ('isbn', "Book with ISBN"),
+    Member: ('member_id', "Member with ID"),
+    Loan: ('loan_id', "Loan with ID"),
+}
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Get the set of 3-character substrings of a string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pause the cyclic garbage collector while a file is turned into objects.
+    
+    Allocating many objects triggers repeated collections that rescan
+    everything built so far, yet none of it is garbage; on large files
+    that doubles the load time.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _group_positions(values: Iterable[str]) -> Dict[str, List[int]]:
+    """Map each value to the positions where it occurs, in ascending order."""
+    groups: Dict[str, List[int]] = {}
+    for position, value in enumerate(values):
+        group = groups.get(value)
+        if group is None:
+            groups[value] = [position]
+        else:
+            group.append(position)
+    return groups
+
+
+def _unreturned_by_due_date(loans: List[Loan]) -> Tuple[List[datetime], List[int]]:
+    """
+    Get the positions of the unreturned loans, ordered by due date.
+    
+    Returns:
+        Tuple (due dates in ascending order, positions of those loans in the same order)
+    """
+    # Work on columns of the loans so that the loops run in C
+    due_dates = list(map(attrgetter('due_date'), loans))
+    unreturned = list(compress(range(len(loans)), map(not_, map(attrgetter('return_date'), loans))))
+    unreturned.sort(key=due_dates.__getitem__)
+    return list(map(due_dates.__getitem__, unreturned)), unreturned
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """
+    Unpickler for snapshots, which only ever hold tuples of str, int,
+    datetime and None. Every other class is refused, so a tampered
+    snapshot can't run code when it is loaded.
+    """
+    
+    def find_class(self, module: str, name: str) -> Any:
+        """Allow datetime, the only class a snapshot refers to."""
+        if module == 'datetime' and name == 'datetime':
+            return datetime
+        raise pickle.UnpicklingError(f"Unexpected class in snapshot: {module}.{name}")
+
+
+def _criterion_matches(item_value, value) -> bool:
+    """Check one search_items criterion: case-insensitive substring for strings, equality otherwise."""
+    if isinstance(item_value, str) and isinstance(value, str):
+        return value.lower() in item_value.lower()
+    return item_value == value
+
 
 class Storage(Generic[T]):
     """Generic storage class for reading/writing data models to CSV files."""
@@ -29,7 +135,35 @@ class Storage(Generic[T]):
         """
         self.data_dir = data_dir
         self.filepath = os.path.join(data_dir, filename)
+        # Pickled field values of the parsed items, which load faster than the CSV
+        self.snapshot_path = os.path.splitext(self.filepath)[0] + '.pkl'
+        self._field_values = attrgetter(*(field.name for field in fields(model_class)))
+        self._string_fields = frozenset(field.name for field in fields(model_class) if field.type is str)
         self.model_class = model_class
+        # Look up the model's details once rather than on every call
+        try:
+            id_attr, self._id_label = _MODEL_SPECS[model_class]
+        except KeyError:
+            raise ValueError(f"Unknown model class: {model_class}") from None
+        # The header names contain nothing that would need quoting
+        self._header_line = ','.join(model_class.CSV_HEADER) + '\r\n'
+        # Get the ID of an item (ISBN for books, member_id for members, loan_id for loans)
+        self._item_id: Callable[[T], str] = attrgetter(id_attr)
+        # Items held in memory while a batch is open, None otherwise
+        self._batch_items: Optional[List[T]] = None
+        self._batch_dirty = False
+        # Whether the batch changed or removed existing items, rather than only adding new ones
+        self._batch_rewrite = False
+        # Position of each ID among the pending items, built on first use
+        self._batch_positions: Optional[Dict[str, int]] = None
+        # Parsed items and the position of each ID in that list, each with
+        # the signature of the file they were read from. Cached items are
+        # never changed in place: items come in and go out as copies.
+        self._cache: Optional[Tuple[Optional[FileSignature], List[T]]] = None
+        self._by_id: Optional[Tuple[Optional[FileSignature], Dict[str, int]]] = None
+        # Lowercased values of string fields, by field name, in the same
+        # order as the cached items, for case-insensitive searches
+        self._lowered: Optional[Tuple[Optional[FileSignature], Dict[str, List[str]]]] = None
         self.ensure_data_dir()
     
     def ensure_data_dir(self):
@@ -39,36 +173,199 @@ class Storage(Generic[T]):
         # Create an empty file if it doesn't exist
         if not os.path.exists(self.filepath):
             with open(self.filepath, 'w', newline='') as file:
-                if self.model_class == Book:
-                    writer = csv.writer(file)
-                    writer.writerow(['ISBN', 'Title', 'Author', 'CopiesTotal', 'CopiesAvailable'])
-                elif self.model_class == Member:
-                    writer = csv.writer(file)
-                    writer.writerow(['MemberID', 'Name', 'PasswordHash', 'Email', 'JoinDate'])
-                elif self.model_class == Loan:
-                    writer = csv.writer(file)
-                    writer.writerow(['LoanID', 'MemberID', 'ISBN', 'IssueDate', 'DueDate', 'ReturnDate'])
+                file.write(self._header_line)
     
     def load_all(self) -> List[T]:
         """
         Load all items from the CSV file.
         
+        The parsed items are cached and only read again when the file has
+        changed. The returned items are copies, which callers may change.
+        
+        Returns:
+            List of model instances (Book, Member, or Loan)
+        """
+        return list(map(copy.copy, self._load_items()))
+    
+    def _load_items(self) -> List[T]:
+        """
+        Get all items, reading the CSV file only if it has changed.
+        
+        The returned list is new, but the items in it are shared with the
+        cache: never change them, only replace them through update_items.
+        
         Returns:
             List of model instances (Book, Member, or Loan)
         """
-        items = []
+        # Inside a batch, serve the pending in-memory copy
+        if self._batch_items is not None:
+            return list(self._batch_items)
+        
+        signature = self._file_signature()
+        if self._cache is not None and self._cache[0] == signature:
+            return list(self._cache[1])
+        
+        with _gc_paused():
+            items = self._load_snapshot(signature)
+            if items is None:
+                items = self._parse_rows(self._iter_rows())
+                # Snapshot what was parsed, unless the file changed meanwhile
+                if signature is not None and self._file_signature() == signature:
+                    self._save_snapshot(items, signature)
+        
+        if self._cache is not None:
+            # Someone else changed the file, so state derived from it is stale
+            self._invalidate()
+        self._reloaded()
+        self._cache = (signature, items)
+        return list(items)
+    
+    def _parse_rows(self, rows: Iterable[List[str]]) -> List[T]:
+        """Turn CSV rows into model instances (overridden by subclasses with a faster bulk parser)."""
+        return list(map(self.model_class.from_csv_row, rows))
+    
+    def _cached_items(self) -> Optional[List[T]]:
+        """Get the cached items if they match the file as it is now, else None."""
+        if self._cache is not None and self._cache[0] == self._file_signature():
+            return self._cache[1]
+        return None
+    
+    def _forget_contents(self) -> None:
+        """Drop the cached items and indexes, e.g. when a write may have failed halfway."""
+        self._cache = None
+        self._by_id = None
+        self._lowered = None
+    
+    def _load_snapshot(self, signature: Optional[FileSignature]) -> Optional[List[T]]:
+        """
+        Load the items from the pickle snapshot, if it was taken of the CSV
+        file exactly as it is now. Any other change to the CSV file, such
+        as a manual edit, makes the snapshot stale and it is ignored.
+        
+        Snapshots are only ever written by this module, and are read with
+        an unpickler that refuses anything but plain values and datetimes.
+        
+        Args:
+            signature: Signature of the CSV file as it is now
+            
+        Returns:
+            List of model instances, or None if there is no usable snapshot
+        """
+        if signature is None:
+            return None
         
         try:
-            with open(self.filepath, 'r', newline='') as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header row
-                for row in reader:
-                    items.append(self.model_class.from_csv_row(row))
+            with open(self.snapshot_path, 'rb') as file:
+                # The header is checked before the (much larger) items are read.
+                # Each pickle gets its own unpickler, since the memo carries over.
+                version, csv_signature = _SnapshotUnpickler(file).load()
+                if version != SNAPSHOT_VERSION or csv_signature != signature[:3]:
+                    return None
+                # The values were validated before they were saved
+                return list(starmap(self.model_class._unsafe, _SnapshotUnpickler(file).load()))
         except FileNotFoundError:
-            # Return empty list if file doesn't exist
+            return None
+        except Exception:
+            # A damaged snapshot just means reading the CSV file instead
+            return None
+    
+    def _save_snapshot(self, items: List[T], signature: FileSignature) -> None:
+        """
+        Save a pickle snapshot of the items, tagged with the CSV file's signature.
+        
+        Args:
+            items: Items in the CSV file
+            signature: Signature of the CSV file that the items were read
+                       from or written to; not the file's current one, which
+                       may already belong to another writer's version
+        """
+        # Each writer uses its own temporary file, which is then renamed over the snapshot
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile('wb', dir=self.data_dir,
+                                             prefix=os.path.basename(self.snapshot_path) + '.',
+                                             suffix='.tmp', delete=False) as file:
+                temp_path = file.name
+                pickle.dump((SNAPSHOT_VERSION, signature[:3]), file, pickle.HIGHEST_PROTOCOL)
+                # Plain tuples pickle several times faster than the objects
+                pickle.dump(list(map(self._field_values, items)), file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            # The snapshot is only a speed-up; the CSV file is what counts
             pass
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _iter_rows(self) -> Iterator[List[str]]:
+        """
+        Iterate over the raw rows of the CSV file, without the header.
+        
+        Returns:
+            Iterator of CSV rows (lists of strings)
+        """
+        # A plain buffered read: with 1 MiB reads, memory-mapping the file
+        # made no measurable difference, since parsing dominates. A mapping
+        # would also keep the old file open across save_all's rename.
+        try:
+            with open(self.filepath, 'r', newline='', buffering=IO_BUFFER_SIZE) as file:
+                reader = csv.reader(file)
+                next(reader, None)  # Skip header row
+                yield from reader
+        except FileNotFoundError:
+            # Yield nothing if file doesn't exist
+            return
+    
+    def _file_signature(self) -> Optional[FileSignature]:
+        """
+        Get the signature of the CSV file as it is now on disk.
+        
+        Returns:
+            Tuple (inode, mtime_ns, size, write count), or None if the file doesn't exist
+        """
+        try:
+            st = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size, _write_counts.get(os.path.abspath(self.filepath), 0)
+    
+    def _count_write(self) -> int:
+        """
+        Record that the file is being written, so cached signatures stop matching.
+        
+        Returns:
+            Number of writes to the file so far, including this one
+        """
+        key = os.path.abspath(self.filepath)
+        _write_counts[key] = count = _write_counts.get(key, 0) + 1
+        return count
+    
+    def _iter_matching(self, row_filter: Callable[[List[str]], bool],
+                       item_filter: Callable[[T], bool]) -> Iterator[T]:
+        """
+        Iterate over the items whose raw CSV row passes a filter.
+        
+        Rows that fail the filter are never turned into model instances,
+        which skips their validation and date parsing.
+        
+        Args:
+            row_filter: Function taking a CSV row and returning True to keep it
+            item_filter: Equivalent check on a model instance, used on items
+                         already in memory
+            
+        Returns:
+            Iterator of matching model instances, which callers may change
+        """
+        # Filter the items already in memory if there are any: the pending
+        # ones inside a batch, or the cache if it's up to date
+        items = self._batch_items if self._batch_items is not None else self._cached_items()
+        if items is not None:
+            yield from map(copy.copy, filter(item_filter, items))
+            return
         
-        return items
+        # filter() and map() run the per-row loop in C; only the
+        # callbacks themselves execute as Python code
+        yield from map(self.model_class.from_csv_row, filter(row_filter, self._iter_rows()))
     
     def save_all(self, items: List[T]) -> None:
         """
@@ -77,47 +374,207 @@ class Storage(Generic[T]):
         Args:
             items: List of model instances to save
         """
-        # Create header row based on model class
-        if self.model_class == Book:
-            header = ['ISBN', 'Title', 'Author', 'CopiesTotal', 'CopiesAvailable']
-        elif self.model_class == Member:
-            header = ['MemberID', 'Name', 'PasswordHash', 'Email', 'JoinDate']
-        elif self.model_class == Loan:
-            header = ['LoanID', 'MemberID', 'ISBN', 'IssueDate', 'DueDate', 'ReturnDate']
-        else:
-            raise ValueError(f"Unknown model class: {self.model_class}")
+        # Inside a batch, defer the write until the batch closes
+        if self._batch_items is not None:
+            self._batch_items = list(items)
+            self._batch_positions = None
+            self._batch_dirty = True
+            self._batch_rewrite = True
+            return
+        
+        # Write a temporary file next to the CSV file and then rename it over
+        # the original. The rename is atomic, so a crash or error part-way
+        # leaves the old file intact instead of a truncated one.
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile('w', newline='', buffering=IO_BUFFER_SIZE, dir=self.data_dir,
+                                             prefix=os.path.basename(self.filepath) + '.',
+                                             suffix='.tmp', delete=False) as file:
+                temp_path = file.name
+                file.write(self._header_line)
+                # Each model formats its own line, which is faster than csv.writer
+                file.writelines(item.to_csv_line() for item in items)
+            
+            # Temporary files are private to the user; keep the CSV file's permissions
+            try:
+                os.chmod(temp_path, stat.S_IMODE(os.stat(self.filepath).st_mode))
+            except FileNotFoundError:
+                pass
+            # A rename keeps the inode, modification time and size, so this
+            # is the saved file's signature, whoever writes the file next
+            saved = os.stat(temp_path)
+            os.replace(temp_path, self.filepath)
+        except BaseException:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
         
-        with open(self.filepath, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(header)
-            for item in items:
-                writer.writerow(item.to_csv_row())
+        # The saved items are now the file's contents
+        signature = (saved.st_ino, saved.st_mtime_ns, saved.st_size, self._count_write())
+        self._cache = (signature, list(items))
+        self._save_snapshot(items, signature)
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Group several changes into a single write of the CSV file.
+        
+        Inside the block, reads and writes go to an in-memory copy of the
+        items and the file is rewritten once when the block exits. If the
+        block only added items, they are appended instead, and the rest of
+        the file is left alone. If the block raises, the pending changes
+        are discarded.
+        """
+        if self._batch_items is not None:
+            # Nested batch: the outermost one writes the file
+            yield
+            return
+        
+        self._batch_items = self._load_items()
+        self._batch_dirty = False
+        self._batch_rewrite = False
+        first_new = len(self._batch_items)
+        # Start from the cached positions of IDs if they match the items
+        if self._by_id is not None and self._by_id[0] == self._cache[0]:
+            self._batch_positions = dict(self._by_id[1])
+        pending = None
+        positions = None
+        rewrite = False
+        try:
+            yield
+            if self._batch_dirty:
+                pending = self._batch_items
+                positions = self._batch_positions
+                rewrite = self._batch_rewrite
+        except BaseException:
+            # State derived from the discarded changes is now wrong
+            self._forget_contents()
+            self._invalidate()
+            raise
+        finally:
+            self._batch_items = None
+            self._batch_positions = None
+            self._batch_dirty = False
+            self._batch_rewrite = False
+        
+        if pending is not None and not rewrite:
+            # Only new items: write just their rows
+            self.append_items(pending[first_new:])
+        elif pending is not None:
+            self.save_all(pending)
+            # Positions kept up to date during the batch still hold
+            if positions is not None:
+                self._by_id = (self._cache[0], positions)
+    
+    def _stored_copy(self, item: T) -> T:
+        """Copy an item to keep in memory (overridden by subclasses to match what the file keeps)."""
+        return copy.copy(item)
+    
+    def _invalidate(self) -> None:
+        """Drop any state derived from the file contents (overridden by subclasses)."""
+    
+    def _reloaded(self) -> None:
+        """Drop state that only this object's own writes keep up to date (overridden by subclasses)."""
     
     def add_item(self, item: T) -> None:
         """
         Add a new item to the CSV file.
         
+        The item is appended as one row; the rest of the file is not
+        read or rewritten.
+        
         Args:
             item: Item to add
         """
-        items = self.load_all()
-        
-        # Check for duplicates
-        if self.model_class == Book:
-            # For books, check by ISBN
-            if any(existing.isbn == item.isbn for existing in items):
-                raise ValueError(f"Book with ISBN {item.isbn} already exists")
-        elif self.model_class == Member:
-            # For members, check by member ID
-            if any(existing.member_id == item.member_id for existing in items):
-                raise ValueError(f"Member with ID {item.member_id} already exists")
-        elif self.model_class == Loan:
-            # For loans, check by loan ID
-            if any(existing.loan_id == item.loan_id for existing in items):
-                raise ValueError(f"Loan with ID {item.loan_id} already exists")
-        
-        items.append(item)
-        self.save_all(items)
+        self.add_items([item])
+    
+    def add_items(self, items: List[T]) -> None:
+        """
+        Add several new items to the CSV file in a single write.
+        
+        The items are appended as rows; the rest of the file is not read
+        or rewritten. If any item's ID is already in use, or repeats among
+        the items, nothing is added.
+        
+        Args:
+            items: Items to add
+        """
+        # Check for duplicates against the cached positions of IDs
+        existing = self._positions()
+        new_ids: Set[str] = set()
+        for item in items:
+            item_id = self._item_id(item)
+            if item_id in existing or item_id in new_ids:
+                raise ValueError(f"{self._id_label} {item_id} already exists")
+            new_ids.add(item_id)
+        
+        self.append_items(items)
+    
+    def append_items(self, items: List[T]) -> None:
+        """
+        Append items to the end of the CSV file in a single write.
+        
+        Unlike add_item, this doesn't check for duplicate IDs, so
+        callers must make sure the items are new.
+        
+        Args:
+            items: Items to append
+        """
+        # Keep copies, since callers may go on changing their items
+        new_items = list(map(self._stored_copy, items))
+        
+        # Inside a batch, add them to the pending in-memory copy
+        if self._batch_items is not None:
+            if self._batch_positions is not None:
+                for position, item in enumerate(new_items, start=len(self._batch_items)):
+                    self._batch_positions.setdefault(self._item_id(item), position)
+            self._batch_items.extend(new_items)
+            self._batch_dirty = True
+            return
+        
+        # Recreate the file, with its header, if it has gone missing
+        self.ensure_data_dir()
+        signature = self._file_signature()
+        cached = self._cached_items()
+        positions_are_current = self._by_id is not None and self._by_id[0] == signature
+        lowered_is_current = self._lowered is not None and self._lowered[0] == signature
+        needs_line_break = self._lacks_final_newline()
+        
+        self._count_write()
+        try:
+            with open(self.filepath, 'a', newline='', buffering=IO_BUFFER_SIZE) as file:
+                if needs_line_break:
+                    file.write('\r\n')
+                file.writelines(item.to_csv_line() for item in new_items)
+        except BaseException:
+            # The file may be half-written, so don't trust anything cached
+            self._forget_contents()
+            self._invalidate()
+            raise
+        
+        # Bring the cache and indexes up to date rather than rebuilding them
+        signature = self._file_signature()
+        if cached is not None:
+            if positions_are_current:
+                positions = self._by_id[1]
+                for position, item in enumerate(new_items, start=len(cached)):
+                    positions.setdefault(self._item_id(item), position)
+                self._by_id = (signature, positions)
+            if lowered_is_current:
+                columns = self._lowered[1]
+                for name, values in columns.items():
+                    values.extend(getattr(item, name).lower() for item in new_items)
+                self._lowered = (signature, columns)
+            cached.extend(new_items)
+            self._cache = (signature, cached)
+    
+    def _lacks_final_newline(self) -> bool:
+        """Check whether the CSV file (e.g. after a manual edit) doesn't end with a line break."""
+        with open(self.filepath, 'rb') as file:
+            if file.seek(0, os.SEEK_END) == 0:
+                return False
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) != b'\n'
     
     def update_item(self, item: T) -> None:
         """
@@ -126,27 +583,44 @@ class Storage(Generic[T]):
         Args:
             item: Item to update
         """
-        items = self.load_all()
-        updated = False
-        
-        for i, existing in enumerate(items):
-            if self.model_class == Book and existing.isbn == item.isbn:
-                items[i] = item
-                updated = True
-                break
-            elif self.model_class == Member and existing.member_id == item.member_id:
-                items[i] = item
-                updated = True
-                break
-            elif self.model_class == Loan and existing.loan_id == item.loan_id:
-                items[i] = item
-                updated = True
-                break
-        
-        if not updated:
-            raise ValueError(f"Item not found for update: {item}")
+        self.update_items([item])
+    
+    def update_items(self, items: List[T]) -> None:
+        """
+        Update several existing items with a single write of the CSV file.
         
-        self.save_all(items)
+        If any item is not found, nothing is updated.
+        
+        Args:
+            items: Items to update
+        """
+        all_items = self._load_items()
+        positions = self._positions()
+        updated: List[int] = []
+        for item in items:
+            position = positions.get(self._item_id(item))
+            if position is None:
+                raise ValueError(f"Item not found for update: {item}")
+            all_items[position] = self._stored_copy(item)
+            updated.append(position)
+        
+        if self._batch_items is not None:
+            # The IDs keep their positions
+            self.save_all(all_items)
+            self._batch_positions = positions
+        else:
+            # Replacing items keeps the positions and lowercased values valid,
+            # so carry them over to the saved file instead of rebuilding them
+            columns = self._lowered[1] if self._lowered is not None and self._lowered[0] == self._cache[0] else None
+            self.save_all(all_items)
+            signature = self._cache[0]
+            self._by_id = (signature, positions)
+            if columns is not None:
+                for name, values in columns.items():
+                    for position in updated:
+                        values[position] = getattr(all_items[position], name).lower()
+                self._lowered = (signature, columns)
+        self._invalidate()
     
     def delete_item(self, item_id: str) -> None:
         """
@@ -155,20 +629,55 @@ class Storage(Generic[T]):
         Args:
             item_id: ID of the item to delete (ISBN for books, member_id for members, loan_id for loans)
         """
-        items = self.load_all()
-        original_count = len(items)
-        
-        if self.model_class == Book:
-            items = [item for item in items if item.isbn != item_id]
-        elif self.model_class == Member:
-            items = [item for item in items if item.member_id != item_id]
-        elif self.model_class == Loan:
-            items = [item for item in items if item.loan_id != item_id]
-        
-        if len(items) == original_count:
+        items = self._load_items()
+        position = self._positions().get(item_id)
+        if position is None:
             raise ValueError(f"Item not found for deletion: {item_id}")
         
+        # Positions after this one shift down, so the indexes are rebuilt on next use
+        del items[position]
         self.save_all(items)
+        self._invalidate()
+    
+    def _positions(self) -> Dict[str, int]:
+        """
+        Get the position of each ID in the list returned by _load_items.
+        
+        Returns:
+            Dictionary mapping ID to the position of the first item with that ID
+        """
+        # Inside a batch, index the pending in-memory copy
+        if self._batch_items is not None:
+            if self._batch_positions is None:
+                self._batch_positions = self._build_positions(self._batch_items)
+            return self._batch_positions
+        
+        signature = self._file_signature()
+        if self._by_id is None or self._by_id[0] != signature or self._cache[0] != signature:
+            items = self._load_items()
+            self._by_id = (self._cache[0], self._build_positions(items))
+        return self._by_id[1]
+    
+    def _build_positions(self, items: List[T]) -> Dict[str, int]:
+        """Map each item's ID to the position of the first item with that ID."""
+        positions: Dict[str, int] = {}
+        for position, item in enumerate(items):
+            positions.setdefault(self._item_id(item), position)
+        return positions
+    
+    def _items_and_positions(self) -> Tuple[List[T], Dict[str, int]]:
+        """
+        Get the current items along with the position of each ID among them.
+        
+        Returns:
+            Tuple (the pending items inside a batch, else the cached ones;
+            dictionary mapping ID to position)
+        """
+        positions = self._positions()
+        if self._batch_items is not None:
+            return self._batch_items, positions
+        # _positions has brought the cache up to date with the file
+        return self._cache[1], positions
     
     def get_item_by_id(self, item_id: str) -> Optional[T]:
         """
@@ -180,17 +689,28 @@ class Storage(Generic[T]):
         Returns:
             Item if found, None otherwise
         """
-        items = self.load_all()
+        items, positions = self._items_and_positions()
+        position = positions.get(item_id)
         
-        for item in items:
-            if self.model_class == Book and item.isbn == item_id:
-                return item
-            elif self.model_class == Member and item.member_id == item_id:
-                return item
-            elif self.model_class == Loan and item.loan_id == item_id:
-                return item
+        # Return a copy, so that callers can change it and then save it
+        # with update_item without touching the stored items
+        return copy.copy(items[position]) if position is not None else None
+    
+    def get_items_by_ids(self, item_ids: Iterable[str]) -> List[Optional[T]]:
+        """
+        Get several items by their IDs at once, e.g. to join them to loans.
         
-        return None
+        Args:
+            item_ids: IDs of the items
+            
+        Returns:
+            List with a copy of the item for each ID, or None where no item
+            has that ID, in the same order as the IDs
+        """
+        items, positions = self._items_and_positions()
+        get_position = positions.get
+        return [copy.copy(items[position]) if position is not None else None
+                for position in map(get_position, item_ids)]
     
     def search_items(self, **kwargs) -> List[T]:
         """
@@ -202,33 +722,55 @@ class Storage(Generic[T]):
         Returns:
             List of matching items
         """
-        items = self.load_all()
-        results = []
+        # String fields are matched against their cached lowercased values
+        text_keys = [key for key, value in kwargs.items() if key in self._string_fields and isinstance(value, str)]
+        items, columns = self._lowered_columns(*text_keys)
+        lowered = dict(zip(text_keys, columns))
+        positions = range(len(items))
         
-        for item in items:
-            match = True
+        # Narrow down the matching positions one criterion at a time
+        for key, value in kwargs.items():
+            if not hasattr(self.model_class, key):
+                return []
             
-            for key, value in kwargs.items():
-                if not hasattr(item, key):
-                    match = False
-                    break
-                
-                item_value = getattr(item, key)
-                
-                # Handle case-insensitive string search
-                if isinstance(item_value, str) and isinstance(value, str):
-                    if value.lower() not in item_value.lower():
-                        match = False
-                        break
-                # Handle exact match for other types
-                elif item_value != value:
-                    match = False
-                    break
+            if key in lowered:
+                keyword = value.lower()
+                values = lowered[key]
+                positions = [position for position in positions if keyword in values[position]]
+            else:
+                positions = [position for position in positions
+                             if _criterion_matches(getattr(items[position], key), value)]
+        
+        return [copy.copy(items[position]) for position in positions]
+    
+    def _lowered_columns(self, *names: str) -> Tuple[List[T], List[List[str]]]:
+        """
+        Get the items along with the lowercased values of some of their string fields.
+        
+        The lowercased values are kept until the file changes, so each
+        value is lowercased once rather than on every search.
+        
+        Args:
+            *names: Names of string fields
             
-            if match:
-                results.append(item)
+        Returns:
+            Tuple (items as from _load_items, one list of lowercased values per field in the same order)
+        """
+        items = self._load_items()
+        
+        # Inside a batch, the pending items may differ from the cached ones
+        if self._batch_items is not None:
+            return items, [[getattr(item, name).lower() for item in items] for name in names]
         
-        return results
+        # _load_items has just brought the cache up to date with the file
+        signature = self._cache[0]
+        if self._lowered is None or self._lowered[0] != signature:
+            self._lowered = (signature, {})
+        columns = self._lowered[1]
+        for name in names:
+            if name not in columns:
+                columns[name] = [getattr(item, name).lower() for item in items]
+        return items, [columns[name] for name in names]
 
 
 class BookStorage(Storage[Book]):
@@ -237,6 +779,34 @@ class BookStorage(Storage[Book]):
     def __init__(self, data_dir: str):
         """Initialize book storage."""
         super().__init__(data_dir, 'books.csv', Book)
+        # Trigram search index, built on first search: (file signature,
+        # books in file order, their lowercased titles and authors,
+        # trigram -> positions of books containing it)
+        self._search_index: Optional[Tuple[Optional[FileSignature], List[Book], List[str], List[str],
+                                           Dict[str, Set[int]]]] = None
+    
+    def _get_search_index(self) -> Tuple[List[Book], List[str], List[str], Dict[str, Set[int]]]:
+        """
+        Get the trigram index over lowercased titles and authors.
+        
+        The index is rebuilt whenever the file has changed.
+        
+        Returns:
+            Tuple (books in file order, lowercased titles, lowercased authors,
+            trigram -> positions in those lists)
+        """
+        signature = self._file_signature()
+        if self._search_index is not None and self._search_index[0] == signature:
+            return self._search_index[1:]
+        
+        books, (titles, authors) = self._lowered_columns('title', 'author')
+        index: Dict[str, Set[int]] = {}
+        for position, (title, author) in enumerate(zip(titles, authors)):
+            for gram in _trigrams(title) | _trigrams(author):
+                index.setdefault(gram, set()).add(position)
+        
+        self._search_index = (self._cache[0], books, titles, authors, index)
+        return books, titles, authors, index
     
     def search_by_title_or_author(self, keyword: str) -> List[Book]:
         """
@@ -248,16 +818,25 @@ class BookStorage(Storage[Book]):
         Returns:
             List of matching books
         """
-        books = self.load_all()
-        results = []
+        keyword = keyword.lower()
+        
+        # Keywords shorter than a trigram can't use the index, and inside
+        # a batch the pending books may differ from the indexed file, so
+        # scan the lowercased titles and authors instead
+        if len(keyword) < 3 or self._batch_items is not None:
+            books, (titles, authors) = self._lowered_columns('title', 'author')
+            return [copy.copy(book) for book, title, author in zip(books, titles, authors)
+                    if keyword in title or keyword in author]
         
-        # Binary search would be more efficient for large datasets
-        # But for simplicity, we'll use a simple linear search
-        for book in books:
-            if keyword.lower() in book.title.lower() or keyword.lower() in book.author.lower():
-                results.append(book)
+        # Every trigram of the keyword must occur in a matching book, so
+        # intersect their postings (smallest first) to get the candidates
+        books, titles, authors, index = self._get_search_index()
+        postings = sorted((index.get(gram, set()) for gram in _trigrams(keyword)), key=len)
+        candidates = set.intersection(*postings)
         
-        return results
+        # Trigrams can match out of order, so confirm each candidate
+        return [copy.copy(books[position]) for position in sorted(candidates)
+                if keyword in titles[position] or keyword in authors[position]]
 
 
 class MemberStorage(Storage[Member]):
@@ -266,6 +845,51 @@ class MemberStorage(Storage[Member]):
     def __init__(self, data_dir: str):
         """Initialize member storage."""
         super().__init__(data_dir, 'members.csv', Member)
+        # Highest member ID and lowercased emails, computed lazily on first use
+        self._max_id: Optional[int] = None
+        self._emails: Optional[Set[str]] = None
+    
+    def _invalidate(self) -> None:
+        """Drop the cached member ID and email set."""
+        self._max_id = None
+        self._emails = None
+    
+    def _reloaded(self) -> None:
+        """Drop the highest member ID and email set, since other writers may have added members."""
+        self._invalidate()
+    
+    def append_items(self, items: List[Member]) -> None:
+        """
+        Append members to the CSV file, keeping the cached ID and emails up to date.
+        
+        Args:
+            items: Members to append
+        """
+        # Work out the new highest ID first, so that a non-numeric ID
+        # fails before anything is written
+        max_id = self._max_id
+        if max_id is not None:
+            max_id = max([max_id, *(int(member.member_id) for member in items)])
+        super().append_items(items)
+        self._max_id = max_id
+        if self._emails is not None:
+            self._emails.update(member.email.lower() for member in items)
+    
+    def next_member_id(self) -> str:
+        """
+        Get the next available member ID.
+        
+        Returns:
+            New member ID
+        """
+        # Read the file again only if another writer may have added members;
+        # otherwise the highest ID is kept up to date as members are appended
+        if self._max_id is None or (self._batch_items is None and self._cached_items() is None):
+            members = self._load_items()
+            if self._max_id is None:
+                # Start with 1001 if no members exist
+                self._max_id = max((int(member.member_id) for member in members), default=1000)
+        return str(self._max_id + 1)
     
     def get_member_by_email(self, email: str) -> Optional[Member]:
         """
@@ -277,13 +901,30 @@ class MemberStorage(Storage[Member]):
         Returns:
             Member if found, None otherwise
         """
-        members = self.load_all()
+        email = email.lower()
         
-        for member in members:
-            if member.email.lower() == email.lower():
-                return member
+        # Only the matching row gets parsed
+        matches = self._iter_matching(lambda row: len(row) > 3 and row[3].lower() == email,
+                                      lambda member: member.email.lower() == email)
+        with closing(matches):
+            return next(matches, None)
+    
+    def has_email(self, email: str) -> bool:
+        """
+        Check whether an email is already registered.
         
-        return None
+        Args:
+            email: Email to check (case-insensitive)
+            
+        Returns:
+            True if a member has this email, False otherwise
+        """
+        # Read the file again if another writer may have added members
+        if self._emails is None or (self._batch_items is None and self._cached_items() is None):
+            members = self._load_items()
+            if self._emails is None:
+                self._emails = {member.email.lower() for member in members}
+        return email.lower() in self._emails
 
 
 class LoanStorage(Storage[Loan]):
@@ -292,6 +933,82 @@ class LoanStorage(Storage[Loan]):
     def __init__(self, data_dir: str):
         """Initialize loan storage."""
         super().__init__(data_dir, 'loans.csv', Loan)
+        # Highest loan ID, computed lazily on first use and then raised as
+        # loans are appended, so issuing a loan doesn't scan every loan ID.
+        # It may run ahead of the file after a delete or a rolled-back batch,
+        # which only skips IDs; it is recomputed when the file is read again.
+        self._max_id: Optional[int] = None
+        # Indexes into the cached loans, by name, each built on first use,
+        # with the loans and the file signature they were built for
+        self._loan_index: Optional[Tuple[Optional[FileSignature], List[Loan], Dict[str, Any]]] = None
+        # Whether get_overdue_loans has already scanned the raw rows once
+        self._scanned_for_overdue = False
+    
+    def _parse_rows(self, rows: Iterable[List[str]]) -> List[Loan]:
+        """Turn CSV rows into loans in bulk."""
+        return Loan.from_csv_rows(rows)
+    
+    def _stored_copy(self, loan: Loan) -> Loan:
+        """Copy a loan to keep in memory, with only the dates that the file keeps."""
+        return loan.date_only()
+    
+    def _reloaded(self) -> None:
+        """Drop the highest loan ID, since other writers may have added loans."""
+        self._max_id = None
+    
+    def append_items(self, items: List[Loan]) -> None:
+        """
+        Append loans to the CSV file, keeping the cached loan ID up to date.
+        
+        Args:
+            items: Loans to append
+        """
+        # Work out the new highest ID first, so that a non-numeric ID
+        # fails before anything is written
+        max_id = self._max_id
+        if max_id is not None:
+            max_id = max([max_id, *(int(loan.loan_id) for loan in items)])
+        super().append_items(items)
+        self._max_id = max_id
+    
+    def _indexed_loans(self, name: str, build: Callable[[List[Loan]], Any]) -> Tuple[List[Loan], Any]:
+        """
+        Get the cached loans along with one index into that list.
+        
+        Each index is built the first time it's needed, so a query only
+        pays for its own index, and all are rebuilt once the file has changed.
+        
+        Args:
+            name: Name of the index
+            build: Function building the index from the loans
+            
+        Returns:
+            Tuple (loans, index)
+        """
+        signature = self._file_signature()
+        if self._loan_index is None or self._loan_index[0] != signature:
+            loans = self._load_items()
+            self._loan_index = (self._cache[0], loans, {})
+        _, loans, indexes = self._loan_index
+        if name not in indexes:
+            indexes[name] = build(loans)
+        return loans, indexes[name]
+    
+    def _loans_by_member(self) -> Tuple[List[Loan], Dict[str, List[int]]]:
+        """Get the cached loans and the positions of each member's loans."""
+        return self._indexed_loans('member_id', lambda loans: _group_positions(map(attrgetter('member_id'), loans)))
+    
+    def _loans_by_isbn(self) -> Tuple[List[Loan], Dict[str, List[int]]]:
+        """Get the cached loans and the positions of each book's loans."""
+        return self._indexed_loans('isbn', lambda loans: _group_positions(map(attrgetter('isbn'), loans)))
+    
+    def _loans_by_due_date(self) -> Tuple[List[Loan], Tuple[List[datetime], List[int]]]:
+        """Get the cached loans and the unreturned ones ordered by due date."""
+        return self._indexed_loans('due_date', _unreturned_by_due_date)
+    
+    def _pending_matching(self, item_filter: Callable[[Loan], bool]) -> List[Loan]:
+        """Get copies of the pending loans that pass a filter, inside a batch."""
+        return [copy.copy(loan) for loan in self._batch_items if item_filter(loan)]
     
     def get_active_loans_for_member(self, member_id: str) -> List[Loan]:
         """
@@ -303,19 +1020,67 @@ class LoanStorage(Storage[Loan]):
         Returns:
             List of active loans
         """
-        loans = self.load_all()
-        return [loan for loan in loans if loan.member_id == member_id and not loan.return_date]
+        if self._batch_items is not None:
+            return self._pending_matching(lambda loan: loan.member_id == member_id and not loan.return_date)
+        
+        loans, by_member = self._loans_by_member()
+        return [copy.copy(loans[position]) for position in by_member.get(member_id, ())
+                if not loans[position].return_date]
+    
+    def get_loans_for_member(self, member_id: str) -> List[Loan]:
+        """
+        Get all loans for a member, active or returned.
+        
+        Args:
+            member_id: ID of the member
+            
+        Returns:
+            List of loans for the member
+        """
+        if self._batch_items is not None:
+            return self._pending_matching(lambda loan: loan.member_id == member_id)
+        
+        loans, by_member = self._loans_by_member()
+        return [copy.copy(loans[position]) for position in by_member.get(member_id, ())]
     
-    def get_overdue_loans(self) -> List[Loan]:
+    def get_overdue_loans(self, now: Optional[datetime] = None) -> List[Loan]:
         """
         Get all overdue loans.
         
+        Args:
+            now: Time to check against (defaults to the current time)
+            
         Returns:
             List of overdue loans
         """
-        loans = self.load_all()
-        today = datetime.now()
-        return [loan for loan in loans if not loan.return_date and loan.due_date < today]
+        if now is None:
+            now = datetime.now()
+        
+        def is_overdue(loan: Loan) -> bool:
+            return not loan.return_date and loan.due_date < now
+        
+        if self._batch_items is not None:
+            return self._pending_matching(is_overdue)
+        
+        # Without parsed loans in memory, scan the raw rows and only build
+        # loans that aren't returned and are due by today. Dates written as
+        # YYYY-MM-DD compare as strings without being parsed; any other due
+        # date (e.g. 2026-9-1 from a manual edit, which parsing accepts) and
+        # malformed rows are passed through to be parsed and checked.
+        # When asked again, load and index the loans so repeat calls are fast.
+        if self._cached_items() is None and not self._scanned_for_overdue:
+            self._scanned_for_overdue = True
+            today = now.date().isoformat()
+            candidates = self._iter_matching(
+                lambda row: len(row) != 6 or (not row[5] and (len(row[4]) != 10 or row[4] <= today)),
+                is_overdue)
+            return [loan for loan in candidates if is_overdue(loan)]
+        
+        # Only unreturned loans can be overdue, and those due before now
+        # come first in due date order; return them in file order
+        loans, (due_dates, by_due_date) = self._loans_by_due_date()
+        overdue = by_due_date[:bisect_left(due_dates, now)]
+        return [copy.copy(loans[position]) for position in sorted(overdue)]
     
     def get_loans_for_book(self, isbn: str) -> List[Loan]:
         """
@@ -327,8 +1092,11 @@ class LoanStorage(Storage[Loan]):
         Returns:
             List of loans for the book
         """
-        loans = self.load_all()
-        return [loan for loan in loans if loan.isbn == isbn]
+        if self._batch_items is not None:
+            return self._pending_matching(lambda loan: loan.isbn == isbn)
+        
+        loans, by_isbn = self._loans_by_isbn()
+        return [copy.copy(loans[position]) for position in by_isbn.get(isbn, ())]
     
     def generate_loan_id(self) -> str:
         """
@@ -337,10 +1105,11 @@ class LoanStorage(Storage[Loan]):
         Returns:
             New loan ID
         """
-        loans = self.load_all()
-        if not loans:
-            return "1"
-        
-        # Get the highest loan ID and increment by 1
-        max_id = max(int(loan.loan_id) for loan in loans)
-        return str(max_id + 1)
+        # Read the file again only if another writer may have added loans;
+        # otherwise the highest ID is kept up to date as loans are appended
+        if self._max_id is None or (self._batch_items is None and self._cached_items() is None):
+            loans = self._load_items()
+            if self._max_id is None:
+                # Start with 1 if no loans exist
+                self._max_id = max((int(loan.loan_id) for loan in loans), default=0)
+        return str(self._max_id + 1)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# tests/test_auth.py
+"""
+Tests for the Library Management System.
+Tests for validation and member registration.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime
+from models import Member
+from auth import validate_password, validate_email, validate_emails, register_member, login, logout
+from library import get_library
+from storage import MemberStorage
+
+
+class TestValidation(unittest.TestCase):
+    """Test case for input validation."""
+    
+    def test_valid_password(self):
+        """Test passwords that meet all requirements."""
+        self.assertTrue(validate_password("Password1"))
+        self.assertTrue(validate_password("1abcdefG"))
+        self.assertTrue(validate_password("Pässwörd1"))
+    
+    def test_invalid_password(self):
+        """Test passwords that miss a requirement."""
+        self.assertFalse(validate_password("Pass1"))        # too short
+        self.assertFalse(validate_password("password1"))    # no uppercase
+        self.assertFalse(validate_password("PASSWORD1"))    # no lowercase
+        self.assertFalse(validate_password("Password"))     # no digit
+        self.assertFalse(validate_password("Pässwörd١"))    # no ASCII digit
+        self.assertFalse(validate_password("ÄÖÜäöü12"))     # no ASCII uppercase
+    
+    def test_validate_email(self):
+        """Test email validation."""
+        self.assertTrue(validate_email("test@example.com"))
+        self.assertFalse(validate_email("test@example"))
+        self.assertFalse(validate_email("not an email"))
+        self.assertEqual(validate_emails(["a@b.com", "a@b", "x.y@example.org"]), [True, False, True])
+
+
+
+class TestRegistration(unittest.TestCase):
+    """Test case for registering and logging in members."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        # Create a temporary test directory, in memory (/dev/shm) where available
+        self._temp_dir = tempfile.TemporaryDirectory(dir='/dev/shm' if os.access('/dev/shm', os.W_OK) else None)
+        self.test_dir = self._temp_dir.name
+    
+    def tearDown(self):
+        """Clean up after tests."""
+        logout()
+        # Forget the shared Library so the next test starts fresh
+        get_library.cache_clear()
+        self._temp_dir.cleanup()
+    
+    def test_register_assigns_sequential_ids(self):
+        """Test that new members get increasing member IDs."""
+        success, message = register_member(self.test_dir, "Ann", "ann@example.com", "Password1", "Password1")
+        self.assertTrue(success)
+        self.assertIn("1001", message)
+        
+        success, message = register_member(self.test_dir, "Bob", "bob@example.com", "Password1", "Password1")
+        self.assertTrue(success)
+        self.assertIn("1002", message)
+    
+    def test_register_after_other_writer(self):
+        """Test that member IDs added through another storage object are not handed out again."""
+        register_member(self.test_dir, "Ann", "ann@example.com", "Password1", "Password1")
+        
+        other_storage = MemberStorage(self.test_dir)
+        other_storage.add_item(Member("5000", "Bob", "$2b$12$test_hash", "bob@example.com", datetime.now()))
+        
+        success, message = register_member(self.test_dir, "Cy", "cy@example.com", "Password1", "Password1")
+        self.assertTrue(success)
+        self.assertIn("5001", message)
+    
+    def test_register_duplicate_email(self):
+        """Test that an email can only be registered once, ignoring case."""
+        success, _ = register_member(self.test_dir, "Ann", "ann@example.com", "Password1", "Password1")
+        self.assertTrue(success)
+        
+        success, message = register_member(self.test_dir, "Ann", "ANN@example.com", "Password1", "Password1")
+        self.assertFalse(success)
+        self.assertEqual(message, "Email is already registered")
+    
+    def test_register_email_added_by_other_writer(self):
+        """Test that an email registered through another storage object counts as taken."""
+        register_member(self.test_dir, "Ann", "ann@example.com", "Password1", "Password1")
+        
+        other_storage = MemberStorage(self.test_dir)
+        other_storage.add_item(Member("5000", "Bob", "$2b$12$test_hash", "bob@example.com", datetime.now()))
+        
+        success, message = register_member(self.test_dir, "Bob", "BOB@example.com", "Password1", "Password1")
+        self.assertFalse(success)
+        self.assertEqual(message, "Email is already registered")
+        self.assertEqual(len(MemberStorage(self.test_dir).load_all()), 2)
+    
+    def test_login(self):
+        """Test logging in by member ID and by email."""
+        register_member(self.test_dir, "Ann", "ann@example.com", "Password1", "Password1")
+        
+        self.assertTrue(login(self.test_dir, "1001", "Password1")[0])
+        self.assertTrue(login(self.test_dir, "ANN@example.com", "Password1")[0])
+        self.assertFalse(login(self.test_dir, "1001", "Password2")[0])
+        self.assertTrue(login(self.test_dir, "admin", "Admin123", "librarian")[0])
+        self.assertFalse(login(self.test_dir, "admin", "Admin1234", "librarian")[0])
+    
+    def test_repeat_login_after_password_change(self):
+        """Test that a remembered login is not reused once the password changes."""
+        register_member(self.test_dir, "Ann", "ann@example.com", "Password1", "Password1")
+        self.assertTrue(login(self.test_dir, "1001", "Password1")[0])
+        
+        member_storage = get_library(self.test_dir).member_storage
+        member = member_storage.get_item_by_id("1001")
+        member.password_hash = Member.hash_password("Password2")
+        member_storage.update_item(member)
+        
+        self.assertFalse(login(self.test_dir, "1001", "Password1")[0])
+        self.assertTrue(login(self.test_dir, "1001", "Password2")[0])
+    
+    def test_hash_rounds_from_environment(self):
+        """Test that BCRYPT_ROUNDS sets the cost of new hashes, within bcrypt's limits."""
+        for value, prefix in (("5", "$2b$05$"), ("1", "$2b$04$"), ("fast", "$2b$12$")):
+            with mock.patch.dict(os.environ, {"BCRYPT_ROUNDS": value}):
+                self.assertTrue(Member.hash_password("Password1").startswith(prefix), value)
+
+
+if __name__ == '__main__':
+    unittest.main()
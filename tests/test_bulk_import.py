@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# tests/test_bulk_import.py
+"""
+Tests for the Library Management System.
+Tests for importing books from a CSV file.
+"""
+
+import os
+import tempfile
+import unittest
+from storage import BookStorage
+from library import Library
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test case for bulk importing books."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        # Create a temporary test directory, in memory (/dev/shm) where available
+        self._temp_dir = tempfile.TemporaryDirectory(dir='/dev/shm' if os.access('/dev/shm', os.W_OK) else None)
+        self.test_dir = self._temp_dir.name
+        
+        self.library = Library(self.test_dir)
+        self.library.add_book("9780132350884", "Clean Code", "Robert C. Martin", 5)
+        self.import_path = os.path.join(self.test_dir, "import.csv")
+    
+    def tearDown(self):
+        """Clean up after tests."""
+        # Remove the test directory
+        self._temp_dir.cleanup()
+    
+    def write_import_file(self, *lines):
+        """Write an import file with a header and the given lines."""
+        with open(self.import_path, 'w', newline='') as file:
+            file.write("ISBN,Title,Author,Copies\n")
+            for line in lines:
+                file.write(line + "\n")
+    
+    def test_import_books(self):
+        """Test that valid rows are all added after the existing books."""
+        self.write_import_file(
+            '9780201633610,Design Patterns,Erich Gamma,2',
+            '9780262033848,"Introduction to Algorithms, Third Edition",Thomas H. Cormen,3'
+        )
+        
+        success, _ = self.library.bulk_add_books(self.import_path)
+        self.assertTrue(success)
+        
+        books = BookStorage(self.test_dir).load_all()
+        self.assertEqual([book.isbn for book in books],
+                         ["9780132350884", "9780201633610", "9780262033848"])
+        self.assertEqual(books[2].title, "Introduction to Algorithms, Third Edition")
+        self.assertEqual(books[2].copies_available, 3)
+    
+    def test_import_rejects_invalid_rows(self):
+        """Test that nothing is added if any row is invalid."""
+        for bad_line in ('9780201633610,Design Patterns,Erich Gamma,0',
+                         '12345,Design Patterns,Erich Gamma,2',
+                         '9780201633610,Design Patterns,Erich Gamma'):
+            self.write_import_file('9780262033848,Introduction to Algorithms,Thomas H. Cormen,3', bad_line)
+            
+            success, message = self.library.bulk_add_books(self.import_path)
+            self.assertFalse(success, bad_line)
+            self.assertIn("line 3", message)
+            self.assertEqual(len(self.library.get_all_books()), 1)
+    
+    def test_import_rejects_taken_isbns(self):
+        """Test that nothing is added if an ISBN is already stored or repeats in the file."""
+        for taken_line in ('9780132350884,Clean Code,Robert C. Martin,1',
+                           '9780262033848,Introduction to Algorithms,Thomas H. Cormen,1'):
+            self.write_import_file('9780262033848,Introduction to Algorithms,Thomas H. Cormen,3', taken_line)
+            
+            success, message = self.library.bulk_add_books(self.import_path)
+            self.assertFalse(success, taken_line)
+            self.assertIn(f"Book with ISBN {taken_line[:13]} already exists", message)
+            self.assertEqual(len(self.library.get_all_books()), 1)
+    
+    def test_import_missing_file(self):
+        """Test importing a file that doesn't exist."""
+        success, _ = self.library.bulk_add_books(os.path.join(self.test_dir, "missing.csv"))
+        self.assertFalse(success)
+
+
+if __name__ == '__main__':
+    unittest.main()
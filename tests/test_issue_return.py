@@ -6,10 +6,11 @@ Tests for issuing and returning books.
 """
 
 import os
-import shutil
+import tempfile
 import unittest
+from unittest import mock
 from datetime import datetime, timedelta
-from models import Book, Member, Loan
+from models import Book, Member, Loan, LOAN_PERIOD
 from storage import BookStorage, MemberStorage, LoanStorage
 from library import Library
 
@@ -19,11 +20,9 @@ class TestIssueReturn(unittest.TestCase):
     
     def setUp(self):
         """Set up test environment."""
-        # Create a temporary test directory
-        self.test_dir = "./test_data"
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
-        os.makedirs(self.test_dir)
+        # Create a temporary test directory, in memory (/dev/shm) where available
+        self._temp_dir = tempfile.TemporaryDirectory(dir='/dev/shm' if os.access('/dev/shm', os.W_OK) else None)
+        self.test_dir = self._temp_dir.name
         
         # Create test data
         self.library = Library(self.test_dir)
@@ -54,8 +53,7 @@ class TestIssueReturn(unittest.TestCase):
     def tearDown(self):
         """Clean up after tests."""
         # Remove the test directory
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
+        self._temp_dir.cleanup()
     
     def test_issue_book(self):
         """Test issuing a book."""
@@ -88,6 +86,16 @@ class TestIssueReturn(unittest.TestCase):
         loans = self.loan_storage.get_loans_for_book(self.test_book.isbn)
         self.assertEqual(len(loans), 0)
     
+    def test_issue_with_failed_book_write(self):
+        """Test that no loan is recorded when saving the book count fails."""
+        # Rewriting the book file fails; appending the loan would not
+        with mock.patch('storage.tempfile.NamedTemporaryFile', side_effect=OSError("disk full")):
+            success, _ = self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        self.assertFalse(success)
+        
+        self.assertEqual(LoanStorage(self.test_dir).load_all(), [])
+        self.assertEqual(BookStorage(self.test_dir).get_item_by_id(self.test_book.isbn).copies_available, 5)
+    
     def test_return_book(self):
         """Test returning a book."""
         # Issue the book first
@@ -159,6 +167,115 @@ class TestIssueReturn(unittest.TestCase):
         overdue_loans = self.library.get_overdue_loans()
         self.assertEqual(len(overdue_loans), 1)
         self.assertEqual(overdue_loans[0][0].loan_id, loan.loan_id)
+    
+    def test_overdue_from_fresh_storage(self):
+        """Test that overdue loans are found the same way before and after loans are loaded."""
+        for _ in range(3):
+            self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        loans = self.loan_storage.get_loans_for_book(self.test_book.isbn)
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # One loan is overdue, one was returned late, and one is due today
+        loans[0].due_date = midnight - timedelta(days=2)
+        loans[1].due_date = midnight - timedelta(days=2)
+        loans[1].return_date = midnight
+        loans[2].due_date = midnight
+        for loan in loans:
+            self.loan_storage.update_item(loan)
+        
+        # The first call scans the file, the second uses the loaded loans
+        for now, overdue in ((midnight, [loans[0]]), (midnight + timedelta(hours=1), [loans[0], loans[2]])):
+            loan_storage = LoanStorage(self.test_dir)
+            for _ in range(2):
+                self.assertEqual([loan.loan_id for loan in loan_storage.get_overdue_loans(now)],
+                                 [loan.loan_id for loan in overdue])
+    
+    def test_overdue_with_unpadded_dates(self):
+        """Test that a manually edited due date without zero padding is found by every call."""
+        with open(self.loan_storage.filepath, 'a', newline='') as file:
+            file.write(f"1,{self.test_member.member_id},{self.test_book.isbn},2024-9-1,2024-9-15,\r\n")
+        
+        loan_storage = LoanStorage(self.test_dir)
+        for _ in range(2):
+            self.assertEqual([loan.loan_id for loan in loan_storage.get_overdue_loans(datetime(2024, 10, 1))], ["1"])
+    
+    def test_loan_ids_follow_other_writers(self):
+        """Test that new loan IDs stay unique when another storage object adds loans."""
+        self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        
+        # The library's cached highest ID must not hide a loan added elsewhere
+        self.loan_storage.add_item(Loan("7", self.test_member.member_id, self.test_book.isbn,
+                                        datetime.now(), datetime.now() + timedelta(days=14), None))
+        success, _ = self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        self.assertTrue(success)
+        loans = self.loan_storage.get_loans_for_book(self.test_book.isbn)
+        self.assertEqual([loan.loan_id for loan in loans], ["1", "7", "8"])
+        
+        # Deleting the newest loan doesn't hand out its ID again
+        self.assertEqual(self.loan_storage.generate_loan_id(), "9")
+        self.loan_storage.delete_item("8")
+        self.assertEqual(self.loan_storage.generate_loan_id(), "9")
+    
+    def test_loan_dates_match_file(self):
+        """Test that loans hold the same dates in memory, in the snapshot and in the CSV file."""
+        self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        self.library.return_book("1")
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # The saved loans, then a fresh load from the snapshot, then one from the CSV file
+        loans = [self.library.loan_storage.get_item_by_id("1"), LoanStorage(self.test_dir).get_item_by_id("1")]
+        os.remove(self.loan_storage.snapshot_path)
+        loans.append(LoanStorage(self.test_dir).get_item_by_id("1"))
+        
+        for loan in loans:
+            self.assertEqual((loan.issue_date, loan.due_date, loan.return_date), (today, today + LOAN_PERIOD, today))
+    
+    def test_non_numeric_id_is_not_written(self):
+        """Test that adding an item with a non-numeric ID fails without writing it."""
+        self.member_storage.next_member_id()
+        self.loan_storage.generate_loan_id()
+        
+        with self.assertRaises(ValueError):
+            self.member_storage.add_item(Member("abc", "Other User", "$2b$12$test_hash", "other@example.com",
+                                                datetime.now()))
+        with self.assertRaises(ValueError):
+            self.loan_storage.add_item(Loan("abc", self.test_member.member_id, self.test_book.isbn,
+                                            datetime.now(), datetime.now() + LOAN_PERIOD))
+        
+        self.assertEqual(MemberStorage(self.test_dir).load_all(), [self.test_member])
+        self.assertEqual(LoanStorage(self.test_dir).load_all(), [])
+        self.assertEqual(self.member_storage.next_member_id(), "1002")
+    
+    def test_return_overdue_book(self):
+        """Test that returning an overdue book reports the days overdue."""
+        self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        loan = self.loan_storage.get_loans_for_book(self.test_book.isbn)[0]
+        loan.due_date = datetime.now() - timedelta(days=3)
+        self.loan_storage.update_item(loan)
+        
+        success, message = self.library.return_book(loan.loan_id)
+        self.assertTrue(success)
+        self.assertIn("3 days overdue", message)
+    
+    def test_member_loans_and_history(self):
+        """Test listing active loans and loan history for a member."""
+        # Issue two copies and return one
+        self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        self.library.issue_book(self.test_book.isbn, self.test_member.member_id)
+        loans = self.loan_storage.get_loans_for_book(self.test_book.isbn)
+        self.library.return_book(loans[0].loan_id)
+        
+        # Only the unreturned loan is active
+        active = self.library.get_member_loans(self.test_member.member_id)
+        self.assertEqual([loan.loan_id for loan, _ in active], [loans[1].loan_id])
+        self.assertEqual(active[0][1].isbn, self.test_book.isbn)
+        
+        # Both loans show up in the history
+        history = self.library.get_loan_history(self.test_member.member_id)
+        self.assertEqual(len(history), 2)
+        
+        # Unknown members have no loans
+        self.assertEqual(self.library.get_loan_history("9999"), [])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# tests/test_models.py
+"""
+Tests for the Library Management System.
+Tests for the data models.
+"""
+
+import csv
+import io
+import unittest
+from unittest import mock
+from datetime import datetime
+import models
+from models import Book, Member, Loan
+
+
+class TestBook(unittest.TestCase):
+    """Test case for the Book model."""
+    
+    def test_valid_isbns(self):
+        """Test that 10- and 13-digit ISBNs are accepted."""
+        for isbn in ("0132350882", "9780132350884"):
+            self.assertEqual(Book(isbn, "Clean Code", "Robert C. Martin", 1, 1).isbn, isbn)
+    
+    def test_invalid_isbns(self):
+        """Test that anything other than 10 or 13 ASCII digits is rejected."""
+        for isbn in ("", "123456789", "97801323508", "978013235088X",
+                     "9780132350884\n", "٩٧٨٠١٣٢٣٥٠٨٨٤"):
+            with self.assertRaises(ValueError, msg=repr(isbn)):
+                Book(isbn, "Clean Code", "Robert C. Martin", 1, 1)
+    
+    def test_csv_row_length(self):
+        """Test that rows with too few or too many fields are rejected."""
+        row = ["9780132350884", "Clean Code", "Robert C. Martin", "5", "5"]
+        self.assertEqual(Book.from_csv_row(row).to_csv_row(), row)
+        for bad_row in (row[:4], row + ["extra"]):
+            with self.assertRaisesRegex(ValueError, "Invalid book CSV row"):
+                Book.from_csv_row(bad_row)
+    
+    def test_csv_line_matches_writer(self):
+        """Test that to_csv_line quotes fields exactly as csv.writer does."""
+        items = [Book("9780132350884", title, "Robert C. Martin", 5, 5)
+                 for title in ("Clean Code", "Code, Complete", 'The "Pragmatic" Programmer', "Line\nbreak", "")]
+        items.append(Member("1001", "Doe, Jane", "$2b$12$hash", "jane@example.com", datetime(2024, 3, 5)))
+        items.append(Loan("1", "1001", "9780132350884", datetime(2024, 3, 5), datetime(2024, 3, 19), datetime(2024, 3, 20)))
+        
+        for item in items:
+            expected = io.StringIO()
+            csv.writer(expected).writerow(item.to_csv_row())
+            self.assertEqual(item.to_csv_line(), expected.getvalue())
+
+
+class TestMember(unittest.TestCase):
+    """Test case for the Member model."""
+    
+    def test_repeated_password_check(self):
+        """Test that a repeated check is remembered without keeping the password."""
+        password_hash = Member.hash_password("Password1")
+        with mock.patch('models.bcrypt.checkpw', wraps=models.bcrypt.checkpw) as checkpw:
+            for _ in range(2):
+                self.assertTrue(Member.check_password("Password1", password_hash))
+                self.assertFalse(Member.check_password("Password2", password_hash))
+        self.assertEqual(checkpw.call_count, 2)
+        self.assertFalse(any(b"Password" in key for key in models._verified))
+
+
+class TestLoan(unittest.TestCase):
+    """Test case for the Loan model."""
+    
+    def test_csv_round_trip(self):
+        """Test that dates are written as YYYY-MM-DD and read back unchanged."""
+        loan = Loan("1", "1001", "9780132350884", datetime(2024, 3, 5, 14, 30), datetime(2024, 3, 19, 14, 30))
+        self.assertEqual(loan.to_csv_row(), ["1", "1001", "9780132350884", "2024-03-05", "2024-03-19", ""])
+        
+        loan.return_date = datetime(2024, 3, 20)
+        self.assertEqual(loan.return_date_str, "2024-03-20")
+        self.assertEqual(Loan.from_csv_row(loan.to_csv_row()).to_csv_row(), loan.to_csv_row())
+    
+    def test_from_csv_rows(self):
+        """Test that bulk parsing gives the same loans as parsing row by row."""
+        rows = [["1", "1001", "9780132350884", "2024-03-05", "2024-03-19", ""],
+                ["2", "1002", "9780201633610", "2024-03-06", "2024-03-20", "2024-03-10"]]
+        self.assertEqual(Loan.from_csv_rows(rows), [Loan.from_csv_row(row) for row in rows])
+        self.assertEqual(Loan.from_csv_rows([]), [])
+        
+        for bad_row in (rows[0][:5], ["3", "1001", "9780132350884", "", "2024-03-19", ""],
+                        ["3", "1001", "9780132350884", "2024-03-05", "19/03/2024", ""]):
+            with self.assertRaises(ValueError, msg=repr(bad_row)):
+                Loan.from_csv_rows(rows + [bad_row])
+
+
+if __name__ == '__main__':
+    unittest.main()
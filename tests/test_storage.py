@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# tests/test_storage.py
+"""
+Tests for the Library Management System.
+Tests for the CSV storage layer.
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from models import Book
+from storage import BookStorage
+
+
+class _RemoveFile:
+    """Pickles as a call to os.remove, to stand in for a malicious snapshot."""
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def __reduce__(self):
+        return os.remove, (self.path,)
+
+
+class TestStorage(unittest.TestCase):
+    """Test case for CSV storage."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        # Create a temporary test directory, in memory (/dev/shm) where available
+        self._temp_dir = tempfile.TemporaryDirectory(dir='/dev/shm' if os.access('/dev/shm', os.W_OK) else None)
+        self.test_dir = self._temp_dir.name
+        
+        self.book_storage = BookStorage(self.test_dir)
+        self.test_book = Book(
+            isbn="9780132350884",
+            title="Clean Code",
+            author="Robert C. Martin",
+            copies_total=5,
+            copies_available=5
+        )
+        self.book_storage.add_item(self.test_book)
+    
+    def tearDown(self):
+        """Clean up after tests."""
+        # Remove the test directory
+        self._temp_dir.cleanup()
+    
+    def test_batch_writes_on_exit(self):
+        """Test that changes made in a batch are saved when it closes."""
+        other_book = Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2)
+        
+        with self.book_storage.batch():
+            self.book_storage.add_item(other_book)
+            self.test_book.copies_available = 4
+            self.book_storage.update_item(self.test_book)
+            
+            # Changes are visible inside the batch but not yet on disk
+            self.assertEqual(len(self.book_storage.load_all()), 2)
+            self.assertEqual(self.book_storage.get_item_by_id(other_book.isbn), other_book)
+            self.assertEqual(len(BookStorage(self.test_dir).load_all()), 1)
+            with self.assertRaises(ValueError):
+                self.book_storage.add_item(other_book)
+        
+        books = BookStorage(self.test_dir).load_all()
+        self.assertEqual([book.isbn for book in books], [self.test_book.isbn, other_book.isbn])
+        self.assertEqual(books[0].copies_available, 4)
+        self.assertEqual(self.book_storage.get_item_by_id(other_book.isbn), other_book)
+    
+    def test_batch_of_additions_appends(self):
+        """Test that a batch which only adds items appends them instead of rewriting the file."""
+        other_books = [Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2),
+                       Book("9780262033848", "Introduction to Algorithms", "Thomas H. Cormen", 3, 3)]
+        
+        with mock.patch.object(self.book_storage, 'save_all', wraps=self.book_storage.save_all) as save_all:
+            with self.book_storage.batch():
+                for book in other_books:
+                    self.book_storage.add_item(book)
+        save_all.assert_not_called()
+        
+        books = BookStorage(self.test_dir).load_all()
+        self.assertEqual(books, [self.test_book] + other_books)
+        self.assertEqual(self.book_storage.get_item_by_id(other_books[1].isbn), other_books[1])
+    
+    def test_batch_discards_on_error(self):
+        """Test that a batch which raises leaves the file untouched."""
+        with self.assertRaises(ValueError):
+            with self.book_storage.batch():
+                self.test_book.copies_available = 0
+                self.book_storage.update_item(self.test_book)
+                # Adding a duplicate ISBN fails and aborts the batch
+                self.book_storage.add_item(self.test_book)
+        
+        book = self.book_storage.get_item_by_id(self.test_book.isbn)
+        self.assertEqual(book.copies_available, 5)
+    
+    def test_search_by_title_or_author(self):
+        """Test that indexed search matches a plain substring search."""
+        self.book_storage.add_item(Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2))
+        
+        def isbns(keyword):
+            return [book.isbn for book in self.book_storage.search_by_title_or_author(keyword)]
+        
+        self.assertEqual(isbns("clean"), [self.test_book.isbn])
+        self.assertEqual(isbns("GAMMA"), ["9780201633610"])
+        self.assertEqual(isbns("e"), [self.test_book.isbn, "9780201633610"])
+        # Every trigram occurs in "Robert C. Martin", but not as one substring
+        self.assertEqual(isbns("ertin"), [])
+        self.assertEqual(isbns("missing"), [])
+        
+        # The index follows changes to the file
+        self.book_storage.delete_item(self.test_book.isbn)
+        self.assertEqual(isbns("clean"), [])
+    
+    def test_search_items(self):
+        """Test that field searches follow items as they are added and updated."""
+        self.assertEqual(self.book_storage.search_items(title="CLEAN"), [self.test_book])
+        
+        other_book = Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2)
+        self.book_storage.add_item(other_book)
+        self.assertEqual(self.book_storage.search_items(author="gamma", copies_total=2), [other_book])
+        
+        self.test_book.title = "Clean Architecture"
+        self.book_storage.update_item(self.test_book)
+        self.assertEqual(self.book_storage.search_items(title="architecture"), [self.test_book])
+        self.assertEqual(self.book_storage.search_by_title_or_author("rchitec"), [self.test_book])
+        self.assertEqual(self.book_storage.search_items(publisher="Prentice Hall"), [])
+    
+    def test_returned_items_are_copies(self):
+        """Test that changing loaded or found items changes neither the storage nor the file."""
+        other_book = Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2)
+        self.book_storage.add_item(other_book)
+        
+        for books in (self.book_storage.search_by_title_or_author("clean"),
+                      self.book_storage.search_by_title_or_author("cl"),
+                      self.book_storage.search_items(title="clean"),
+                      self.book_storage.load_all()[:1]):
+            books[0].title = "Changed"
+            books[0].copies_available = 0
+        
+        self.assertEqual(self.book_storage.get_item_by_id(self.test_book.isbn), self.test_book)
+        self.assertEqual(self.book_storage.search_by_title_or_author("clean"), [self.test_book])
+        self.assertEqual(self.book_storage.search_items(title="clean"), [self.test_book])
+        
+        # Saving another book doesn't write the changes either
+        other_book.copies_available = 1
+        self.book_storage.update_item(other_book)
+        self.assertEqual(BookStorage(self.test_dir).load_all(), [self.test_book, other_book])
+    
+    def test_lookup_follows_other_writers(self):
+        """Test that lookups see changes made through another storage object."""
+        self.assertEqual(self.book_storage.get_item_by_id(self.test_book.isbn).copies_available, 5)
+        
+        # Same file size, and likely the same modification time
+        other_storage = BookStorage(self.test_dir)
+        self.test_book.copies_available = 4
+        other_storage.update_item(self.test_book)
+        
+        self.assertEqual(self.book_storage.get_item_by_id(self.test_book.isbn).copies_available, 4)
+    
+    def test_snapshot_matches_csv(self):
+        """Test that the snapshot is used only while the CSV file is unchanged."""
+        self.assertTrue(os.path.exists(self.book_storage.snapshot_path))
+        self.assertEqual(BookStorage(self.test_dir).load_all(), [self.test_book])
+        
+        # A manual edit of the CSV file makes the snapshot stale
+        with open(self.book_storage.filepath, 'a', newline='') as file:
+            file.write("9780201633610,Design Patterns,Erich Gamma,2,2\r\n")
+        books = BookStorage(self.test_dir).load_all()
+        self.assertEqual([book.isbn for book in books], [self.test_book.isbn, "9780201633610"])
+    
+    def add_row_elsewhere(self):
+        """Append a book to the CSV file the way another process would."""
+        with open(self.book_storage.filepath, 'a', newline='') as file:
+            file.write("9780201633610,Design Patterns,Erich Gamma,2,2\r\n")
+    
+    def test_snapshot_of_file_changed_meanwhile(self):
+        """Test that a snapshot is tagged with the file its items came from, not a later one."""
+        book_storage = BookStorage(self.test_dir)
+        file_signature = book_storage._file_signature
+        calls = []
+        
+        def signature_then_change_file():
+            # Another writer changes the file right after the check that
+            # it didn't change while being read
+            signature = file_signature()
+            calls.append(signature)
+            if len(calls) == 2:
+                self.add_row_elsewhere()
+            return signature
+        
+        with mock.patch.object(book_storage, '_file_signature', side_effect=signature_then_change_file):
+            self.assertEqual(book_storage.load_all(), [self.test_book])
+        self.assertEqual(len(BookStorage(self.test_dir).load_all()), 2)
+    
+    def test_save_followed_by_other_writer(self):
+        """Test that a save doesn't take a change made right after it for its own."""
+        real_replace = os.replace
+        
+        def replace_then_change_file(source, target):
+            real_replace(source, target)
+            if target == self.book_storage.filepath:
+                self.add_row_elsewhere()
+        
+        with mock.patch('storage.os.replace', side_effect=replace_then_change_file):
+            self.book_storage.save_all([self.test_book])
+        self.assertEqual(len(self.book_storage.load_all()), 2)
+        self.assertEqual(len(BookStorage(self.test_dir).load_all()), 2)
+    
+    def test_snapshot_cannot_run_code(self):
+        """Test that a snapshot referring to anything but plain values is ignored, not run."""
+        marker_path = os.path.join(self.test_dir, "marker")
+        open(marker_path, 'w').close()
+        # Loading from a fresh storage snapshots the file as it is now
+        BookStorage(self.test_dir).load_all()
+        with open(self.book_storage.snapshot_path, 'rb') as file:
+            header = pickle.load(file)
+        with open(self.book_storage.snapshot_path, 'wb') as file:
+            pickle.dump(header, file)
+            pickle.dump(_RemoveFile(marker_path), file)
+        
+        self.assertEqual(BookStorage(self.test_dir).load_all(), [self.test_book])
+        self.assertTrue(os.path.exists(marker_path))
+    
+    def test_add_appends_row(self):
+        """Test that adding an item appends it, even after a manual edit without a final newline."""
+        with open(self.book_storage.filepath, 'rb+') as file:
+            file.seek(-2, os.SEEK_END)
+            file.truncate()
+        
+        self.book_storage.add_item(Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2))
+        books = BookStorage(self.test_dir).load_all()
+        self.assertEqual([book.isbn for book in books], [self.test_book.isbn, "9780201633610"])
+        
+        with self.assertRaises(ValueError):
+            self.book_storage.add_item(self.test_book)
+    
+    def test_repeated_loads_use_cache(self):
+        """Test that unchanged files are not read again, and that saved items are copies."""
+        self.book_storage.load_all()
+        with mock.patch.object(self.book_storage, '_iter_rows', side_effect=AssertionError("file re-read")), \
+             mock.patch.object(self.book_storage, '_load_snapshot', side_effect=AssertionError("snapshot re-read")):
+            self.assertEqual(self.book_storage.load_all(), [self.test_book])
+            
+            # Changing an item after saving it doesn't change what's stored
+            self.test_book.copies_available = 4
+            self.book_storage.update_item(self.test_book)
+            self.test_book.copies_available = 3
+            self.assertEqual(self.book_storage.load_all()[0].copies_available, 4)
+            self.assertEqual(self.book_storage.get_item_by_id(self.test_book.isbn).copies_available, 4)
+        
+        self.assertEqual(BookStorage(self.test_dir).load_all()[0].copies_available, 4)
+    
+    def test_update_and_delete_by_id(self):
+        """Test that lookups stay correct as items are updated and deleted."""
+        other_books = [Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2),
+                       Book("9780262033848", "Introduction to Algorithms", "Thomas H. Cormen", 3, 3)]
+        for book in other_books:
+            self.book_storage.add_item(book)
+        
+        other_books[0].copies_available = 1
+        self.book_storage.update_item(other_books[0])
+        self.book_storage.delete_item(self.test_book.isbn)
+        
+        self.assertIsNone(self.book_storage.get_item_by_id(self.test_book.isbn))
+        self.assertEqual(self.book_storage.get_item_by_id("9780201633610").copies_available, 1)
+        other_books[1].copies_available = 2
+        self.book_storage.update_item(other_books[1])
+        self.assertEqual([book.copies_available for book in BookStorage(self.test_dir).load_all()], [1, 2])
+        
+        with self.assertRaises(ValueError):
+            self.book_storage.delete_item(self.test_book.isbn)
+        with self.assertRaises(ValueError):
+            self.book_storage.update_item(self.test_book)
+    
+    def test_add_and_update_many(self):
+        """Test that several items are added or updated together, or not at all."""
+        other_books = [Book("9780201633610", "Design Patterns", "Erich Gamma", 2, 2),
+                       Book("9780262033848", "Introduction to Algorithms", "Thomas H. Cormen", 3, 3)]
+        
+        # A clash with a stored or another new ID adds nothing
+        for books in ([other_books[0], self.test_book], [other_books[0], other_books[0]]):
+            with self.assertRaises(ValueError):
+                self.book_storage.add_items(books)
+            self.assertEqual(len(BookStorage(self.test_dir).load_all()), 1)
+        
+        self.book_storage.add_items(other_books)
+        
+        for book in other_books:
+            book.copies_available -= 1
+        with mock.patch.object(self.book_storage, 'save_all', wraps=self.book_storage.save_all) as save_all:
+            self.book_storage.update_items(other_books)
+        save_all.assert_called_once()
+        self.assertEqual([book.copies_available for book in BookStorage(self.test_dir).load_all()], [5, 1, 2])
+        self.assertEqual(self.book_storage.get_item_by_id("9780262033848").copies_available, 2)
+        
+        missing_book = Book("9780596007126", "Head First Design Patterns", "Eric Freeman", 1, 1)
+        with self.assertRaises(ValueError):
+            self.book_storage.update_items([self.test_book, missing_book])
+    
+    def test_failed_save_keeps_file(self):
+        """Test that an error while saving leaves the old file in place."""
+        with open(self.book_storage.filepath) as file:
+            contents = file.read()
+        
+        broken_book = mock.Mock(to_csv_line=mock.Mock(side_effect=RuntimeError("disk full")))
+        with self.assertRaises(RuntimeError):
+            self.book_storage.save_all([self.test_book, broken_book])
+        
+        with open(self.book_storage.filepath) as file:
+            self.assertEqual(file.read(), contents)
+        self.assertEqual([name for name in os.listdir(self.test_dir) if name.endswith('.tmp')], [])
+        self.assertEqual(self.book_storage.load_all(), [self.test_book])
+    
+    def test_lookup_returns_copy(self):
+        """Test that changing looked-up items doesn't change the stored ones."""
+        book = self.book_storage.get_item_by_id(self.test_book.isbn)
+        book.copies_available = 0
+        self.assertEqual(self.book_storage.get_item_by_id(self.test_book.isbn).copies_available, 5)
+        self.assertIsNone(self.book_storage.get_item_by_id("9780201633610"))
+        
+        books = self.book_storage.get_items_by_ids(["9780201633610", self.test_book.isbn])
+        self.assertEqual(books, [None, self.test_book])
+        books[1].copies_available = 0
+        self.assertEqual(self.book_storage.get_item_by_id(self.test_book.isbn).copies_available, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()